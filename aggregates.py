@@ -0,0 +1,206 @@
+import numpy as np
+import pandas as pd
+
+BAND_ORDER = ["$0-5K", "$5-10K", "$10-20K", "$20-30K", "$30K+"]
+
+# Additive partials kept per (client_segment, deal_band); any selection of
+# segments is answered by summing rows, never by rescanning the deals.
+CUBE_MEASURES = [
+    'total_deals', 'converted_deals', 'converted_revenue',
+    'missed_revenue', 'missed_deal_count', 'lead_time_sum', 'lead_time_count'
+]
+
+def cube_groups(deals):
+    """
+    Returns the (segment, band) group code of every deal and the segment names
+    the codes refer to. Group g is segment g // (len(BAND_ORDER) + 1) and band
+    g % (len(BAND_ORDER) + 1), the last band slot holding deals without a band.
+
+    Parameters:
+    - deals: DataFrame with client_segment and deal_band.
+    """
+    segment_codes, segments = pd.factorize(deals['client_segment'], sort=True, use_na_sentinel=False)
+    band_codes = pd.Categorical(deals['deal_band'], categories=BAND_ORDER, ordered=True).codes.astype(np.intp)
+    band_codes[band_codes < 0] = len(BAND_ORDER)
+    return segment_codes * (len(BAND_ORDER) + 1) + band_codes, np.asarray(segments, dtype=object)
+
+def cube_totals(deals, group, n_groups):
+    """
+    Sums every cube measure per group code: one weighted bincount per measure,
+    with the converted flag turning sums into conditional sums. Returns an
+    array of shape (n_groups, len(CUBE_MEASURES)).
+
+    Parameters:
+    - deals: DataFrame with converted, decimal_value and lead_time.
+    - group: group code of every row of deals.
+    - n_groups: number of group codes.
+    """
+    converted = deals['converted'].to_numpy(dtype=bool)
+    value = deals['decimal_value'].to_numpy(dtype=float)
+    lead_time = deals['lead_time'].to_numpy(dtype=float)
+    has_lead_time = ~np.isnan(lead_time)
+
+    weights = {
+        'total_deals': None,
+        'converted_deals': converted,
+        'converted_revenue': np.where(converted, value, 0.0),
+        'missed_revenue': np.where(converted, 0.0, value),
+        'missed_deal_count': ~converted,
+        'lead_time_sum': np.where(has_lead_time, lead_time, 0.0),
+        'lead_time_count': has_lead_time,
+    }
+    return np.column_stack([np.bincount(group, weights=weights[name], minlength=n_groups) for name in CUBE_MEASURES])
+
+def cube_frame(totals, segments):
+    """
+    Turns per-group totals into the cube DataFrame: one row per (segment, band)
+    group holding at least one deal, in segment then band order.
+
+    Parameters:
+    - totals: array returned by cube_totals (or a sum of them).
+    - segments: segment names returned by cube_groups.
+    """
+    n_bands = len(BAND_ORDER) + 1
+    group_ids = np.flatnonzero(totals[:, 0] > 0)
+    band_ids = group_ids % n_bands
+    cube = pd.DataFrame({
+        'client_segment': segments[group_ids // n_bands],
+        'deal_band': pd.Categorical.from_codes(np.where(band_ids < len(BAND_ORDER), band_ids, -1),
+                                               categories=BAND_ORDER, ordered=True),
+    })
+    for i, name in enumerate(CUBE_MEASURES):
+        values = totals[group_ids, i]
+        cube[name] = values.astype('int64') if name.endswith(('deals', 'count')) else values
+    return cube
+
+def build_segment_cube(deals):
+    """
+    Builds the per-segment, per-band cube of additive partials from cleaned deals
+    in a single pass: every row gets one (segment, band) group code and each
+    measure is a weighted bincount over those codes. Rows with a missing
+    segment or band are kept so overall totals stay exact.
+
+    Parameters:
+    - deals: DataFrame with client_segment, deal_band, converted, decimal_value and lead_time.
+    """
+    group, segments = cube_groups(deals)
+    return cube_frame(cube_totals(deals, group, len(segments) * (len(BAND_ORDER) + 1)), segments)
+
+class SegmentIndex:
+    """
+    Row positions of every client segment in one table, built once when a
+    snapshot is loaded. A selection is answered by merging the positions of the
+    chosen segments into a bitmap and taking a single positional slice, instead
+    of comparing every row's segment string. Rows keep their original order,
+    exactly as with a boolean isin filter.
+
+    Parameters:
+    - frame: table to index; it must not be modified afterwards.
+    - column: column holding the segment of each row.
+    """
+
+    def __init__(self, frame, column='client_segment'):
+        self.frame = frame
+        codes, segments = pd.factorize(frame[column], sort=True)
+        order = np.argsort(codes, kind='stable').astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(segments))
+        # Rows with a missing segment sort first (code -1) and belong to no segment
+        bounds = np.cumsum(np.concatenate([[len(codes) - counts.sum()], counts]))
+        self.positions = {str(segment): order[start:end] for segment, start, end in zip(segments, bounds[:-1], bounds[1:])}
+        self.indexed_rows = int(counts.sum())
+
+    def rows(self, segments):
+        """
+        Returns the sorted row positions of the given segments; unknown names are ignored.
+
+        Parameters:
+        - segments: iterable of client segment names.
+        """
+        parts = [self.positions[s] for s in set(segments) if s in self.positions]
+        if len(parts) == 1:
+            return parts[0]
+        bitmap = np.zeros(len(self.frame), dtype=bool)
+        for part in parts:
+            bitmap[part] = True
+        return np.flatnonzero(bitmap)
+
+    def select(self, segments):
+        """
+        Returns the rows of the indexed table that belong to the given segments.
+
+        Parameters:
+        - segments: iterable of client segment names.
+        """
+        rows = self.rows(segments)
+        if len(rows) == len(self.frame):
+            return self.frame
+        return self.frame.iloc[rows]
+
+def summarize(cube):
+    """
+    Rolls a slice of the cube up to the overview KPIs.
+
+    Parameters:
+    - cube: cube rows for the selected segments.
+    """
+    totals = cube[CUBE_MEASURES].sum()
+    return {
+        'total_revenue': totals['converted_revenue'],
+        'conversion_rate': totals['converted_deals'] / totals['total_deals'] if totals['total_deals'] else np.nan,
+        'converted_deals': int(totals['converted_deals']),
+        'avg_lead_time': totals['lead_time_sum'] / totals['lead_time_count'] if totals['lead_time_count'] else np.nan,
+    }
+
+def segment_table(cube):
+    """
+    Rolls the cube up to the grouped_segments_df table (one row per client segment).
+
+    Parameters:
+    - cube: DataFrame returned by build_segment_cube.
+    """
+    total_rev_overall = cube['converted_revenue'].sum()
+    seg = cube.dropna(subset=['client_segment']).groupby('client_segment')[CUBE_MEASURES].sum().reset_index()
+    has_revenue = seg['converted_deals'] > 0
+
+    final_df = seg[['client_segment', 'converted_deals', 'total_deals']].copy()
+    final_df['conversion_rate'] = (seg['converted_deals'] / seg['total_deals']).round(2)
+    final_df['pct_total_deals'] = ((seg['total_deals'] / seg['total_deals'].sum()) * 100).round(2)
+
+    segment_revenue = seg['converted_revenue'].where(has_revenue)
+    final_df['segment_revenue'] = segment_revenue.fillna(0).round()
+    final_df['avg_deal_size'] = (segment_revenue / seg['converted_deals'].where(has_revenue)).fillna(0).round()
+    final_df['avg_lead_time'] = (seg['lead_time_sum'] / seg['lead_time_count'].replace(0, np.nan)).round(1)
+    final_df['percent_total_revenue'] = ((segment_revenue / total_rev_overall) * 100).round(2)
+    final_df['client_segment'] = final_df['client_segment'].astype(str)
+
+    return final_df
+
+def band_table(cube):
+    """
+    Rolls the cube up to the conv_rate_revenue_band table (every segment x deal band).
+
+    Parameters:
+    - cube: DataFrame returned by build_segment_cube.
+    """
+    total_rev_overall = cube['converted_revenue'].sum()
+    banded = cube.dropna(subset=['client_segment', 'deal_band'])
+    bands = banded.groupby(['client_segment', 'deal_band'], observed=False)[CUBE_MEASURES].sum().reset_index()
+
+    final_df = bands[['client_segment', 'deal_band', 'converted_deals', 'total_deals']].copy()
+    final_df['client_segment'] = final_df['client_segment'].astype(str)
+    final_df['conversion_rate'] = (bands['converted_deals'] / bands['total_deals'] * 100).fillna(0)
+    final_df['total_revenue_segment'] = bands['converted_revenue']
+
+    # Segments without any converted deal have no revenue share at all
+    segment_converted = bands.groupby('client_segment')['converted_deals'].transform('sum')
+    final_df['percent_total_revenue'] = (bands['converted_revenue'] / total_rev_overall * 100).round(4).where(segment_converted > 0)
+
+    segment_pct = final_df.groupby('client_segment')['percent_total_revenue'].transform('sum')
+    final_df['percent_rev_within_segment'] = (final_df['percent_total_revenue'] / segment_pct * 100).where(segment_pct > 0, 0).round(2)
+
+    final_df['avg_deal_size'] = (final_df['total_revenue_segment'] / final_df['converted_deals']).replace([np.inf, -np.inf], 0).fillna(0)
+    final_df['expected_value'] = ((final_df['conversion_rate'] / 100) * final_df['avg_deal_size']).round(2)
+    final_df['missed_revenue'] = bands['missed_revenue']
+    final_df['missed_deal_count'] = bands['missed_deal_count']
+
+    return final_df
@@ -1,10 +1,20 @@
+import os
+import time
+import threading
+from collections import OrderedDict
 import dash
 import dash_auth
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, Patch, ClientsideFunction, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
+from flask import request
 import plotly.graph_objects as go
+from figure_cache import FigureCache, SharedFigureCache, CompressedPayload, segment_key, window_key, ALL_DATES
+from callback_metrics import CallbackMetrics
+
+# Bound by load_data: pandas, plotly.express and the data layer stay off the import
+# path, so under DEFERRED_STARTUP the server answers before they are loaded
+px = summarize = data_refresher = BAND_ORDER = None
 
 VALID_USERNAME_PASSWORD_PAIRS = {
     'admin': 'demo'
@@ -27,8 +37,6 @@ DEAL_BAND_MAP = {
     "$30K+": CHARCOAL
 }
 
-BAND_ORDER = ["$0-5K", "$5-10K", "$10-20K", "$20-30K", "$30K+"]
-
 TAB_STYLE = {
     'padding': '12px',
     'fontWeight': '400',
@@ -54,14 +62,28 @@ TAB_SELECTED_STYLE = {
     'letterSpacing': '1px'
 }
 
-app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# compress gzips callback responses (flask-compress); the precompressed layout is sent as is
+app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP], compress=True)
 server = app.server
 
+# Registered ahead of dash_auth's check, so /healthz is the one route answered without
+# a login (dash_auth's public_routes would also open the layout, which carries the data)
+@server.before_request
+def health_check():
+    if request.path == '/healthz':
+        return {'status': 'ok', 'data_ready': data_ready.is_set()}
+
 auth = dash_auth.BasicAuth(
     app,
     VALID_USERNAME_PASSWORD_PAIRS
 )
 
+# Self time per phase of each callback run; figures excludes the filter and apply_style
+# time spent inside it, serialize covers the cache lookup and JSON conversion
+METRIC_PHASES = ['filter', 'figures', 'apply_style', 'serialize']
+callback_metrics = CallbackMetrics()
+
+@callback_metrics.phase('apply_style')
 def apply_style(fig, title):
 
     fig.update_layout(
@@ -74,6 +96,9 @@ def apply_style(fig, title):
         yaxis=dict(showgrid=False, color=CHARCOAL, title_text="")
     )
     
+    # Nothing to colour when a filter leaves no traces (e.g. a date window without deals)
+    if not fig.data:
+        return fig
 
     # Get number of bars if bar chart
     is_bar = fig.data[0].type == 'bar'
@@ -102,161 +127,360 @@ def apply_style(fig, title):
             
     return fig
 
-grouped_segments_df = pd.read_csv('./data/grouped_segments_df.csv')
-conv_rate_revenue_band = pd.read_csv('./data/conv_rate_revenue_band.csv')
-client_type_df = pd.read_csv('./data/client_type_df.csv')
-deals_clean_df = pd.read_csv('./data/deals_clean.csv')
-
-client_segments = sorted(grouped_segments_df['client_segment'].unique().tolist())
-
-app.layout = html.Div([
-    html.Div([
-        html.Img(src="/assets/whitelabel.png", style={"width": "100%", "marginBottom": "40px"}), 
-        html.P("Data Scope: Jan 2022 – Present", 
-            style={"fontSize": "12px", "color": "#8c7d55", "marginTop": "-30px", "marginBottom": "30px", "textAlign": "center"}),
-        html.H5("DASHBOARD FILTERS", style={"color": CHARCOAL, "letterSpacing": "2px", "fontSize": "14px"}),
-        html.Hr(),
-        html.P("Client Segment", className="small mb-1", style={"color": CHARCOAL}),
-        dcc.Dropdown(
-            id='client-segment-dropdown',
-            options=[{'label': 'All Segments', 'value': 'ALL'}] + [{'label': seg, 'value': seg} for seg in client_segments],
-            multi=True,
-            value=['ALL'],
-            className="mb-4",
-            style={'fontSize': '12px'}
-        ),
-    ], style={
-        "position": "fixed", "top": 0, "left": 0, "bottom": 0,
-        "width": "18rem", "padding": "2rem 1rem", "backgroundColor": CREAM,
-        "borderRight": f"1px solid {GOLD}"
-    }),
-
-    html.Div([
-    dcc.Tabs([
-        # TAB 1: Client Segment Overview
-        dcc.Tab(label='Client Segment Overview', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
-            dbc.Container([
-                dbc.Row([
-                    dbc.Col(html.Div(id='kpi-overview-1'), width=3),
-                    dbc.Col(html.Div(id='kpi-overview-2'), width=3),
-                    dbc.Col(html.Div(id='kpi-overview-3'), width=3),
-                    dbc.Col(html.Div(id='kpi-overview-4'), width=3),
-                ], className="mt-4 mb-4", style={"paddingLeft": "15px"}),
+# Shared mode (e.g. SHARED_DATA_DIR=/dev/shm/company-dash under gunicorn): workers
+# memory-map one copy of the deal table and share a single figure cache
+SHARED_DATA_DIR = os.getenv("SHARED_DATA_DIR")
+
+# CLIENTSIDE_OVERVIEW=1 ships the small tab 1 tables to the browser once per page
+# load; segment filtering, sorting and the KPIs then run in assets/overview.js.
+# A page picks up refreshed data on its next load.
+CLIENTSIDE_OVERVIEW = os.getenv("CLIENTSIDE_OVERVIEW", "0") == "1"
+
+# Tab values; each tab's figures are only computed while it is the selected tab
+TABS = ['overview', 'deep_dive', 'opportunity']
+
+# DEFERRED_STARTUP=1 (e.g. on a host that sleeps when idle): the server answers the
+# layout and /healthz as soon as it is up, while the heavy imports and the data load
+# in a background thread. Until then pages get the layout without data, and
+# callbacks wait up to STARTUP_TIMEOUT_SECONDS for it.
+DEFERRED_STARTUP = os.getenv("DEFERRED_STARTUP", "0") == "1"
+STARTUP_TIMEOUT_SECONDS = float(os.getenv("STARTUP_TIMEOUT_SECONDS", 120))
+data_ready = threading.Event()
+
+# The version is set when the first snapshot is warmed
+if SHARED_DATA_DIR:
+    figure_cache = SharedFigureCache(os.path.join(SHARED_DATA_DIR, 'figure_cache.sqlite'))
+else:
+    figure_cache = FigureCache()
+
+@server.route('/cache-stats')
+def cache_stats():
+    payload = layout_payloads.get(data_refresher.current.version) if data_ready.is_set() else None
+    return {**figure_cache.stats(), 'layout': payload.stats() if payload else None}
+
+@server.route('/callback-metrics')
+def callback_metrics_report():
+    return callback_metrics.summary(METRIC_PHASES)
+
+@server.after_request
+def record_callback_payload(response):
+    if request.path.endswith('/_dash-update-component'):
+        callback_metrics.record_payload(response.calculate_content_length())
+    return response
+
+def cached_outputs(data, key, build, *args):
+    built = False
+
+    def compute():
+        nonlocal built
+        built = True
+        with callback_metrics.phase('figures'):
+            return build(data, *args)
+
+    # Keys carry the snapshot version so in-flight callbacks on an old snapshot never serve the new one
+    with callback_metrics.phase('serialize'):
+        payload = figure_cache.get_or_compute((data.version,) + key, compute)
+    callback_metrics.annotate(cache_hit=not built)
+    return payload
+
+def current_snapshot():
+    # Callbacks wait here for the first snapshot; it is already loaded unless DEFERRED_STARTUP is set
+    if not data_ready.wait(STARTUP_TIMEOUT_SECONDS):
+        raise RuntimeError("Dashboard data is still loading")
+    return data_refresher.current
+
+def current_data(start_date=None, end_date=None):
+    # The current snapshot, restricted to the date picker's window when one is set
+    return current_snapshot().for_window(window_key(start_date, end_date))
+
+def tab_render_token(tab, active_tab, rendered, data, selected_segments):
+    """
+    Returns the token recording what a tab is about to show, stored in its
+    <tab>-rendered dcc.Store. Raises PreventUpdate instead when the tab is hidden
+    (it is computed once opened) or already shows this selection of this data.
+
+    Parameters:
+    - tab: value of the tab the callback fills.
+    - active_tab: value of the selected tab.
+    - rendered: token the tab's store holds, None until it first renders.
+    - data: current DashboardData, or the DataWindow of the selected dates.
+    - selected_segments: dropdown value.
+    """
+    token = [data.version, list(segment_key(selected_segments, data.client_segments)), list(data.window)]
+    if active_tab != tab or rendered == token:
+        raise PreventUpdate
+    return token
+
+def default_outputs(data):
+    # Every tab's 'All Segments' outputs over all dates, by component id, and the matching render token
+    default_key = segment_key(['ALL'], data.client_segments)
+    outputs = (cached_outputs(data, ('overview', default_key, ALL_DATES), build_overview_charts, ['ALL'])
+               + cached_outputs(data, ('deep_dive', default_key, ALL_DATES), build_deep_dive_charts, ['ALL'])
+               + cached_outputs(data, ('opportunity', default_key, ALL_DATES, 'ALL'), build_opportunity_charts, ['ALL'], 'ALL'))
+    ids = ([f'chart-{i}' for i in range(1, 6)] + [f'kpi-overview-{i}' for i in range(1, 5)]
+           + [f'chart-{i}' for i in range(6, 10)] + ['chart-priority-matrix', 'chart-lvi', 'chart-missed-rev'])
+    return dict(zip(ids, outputs)), [data.version, list(default_key), list(ALL_DATES)]
+
+def serve_layout():
+    return build_layout(data_refresher.current if data_ready.is_set() else None)
+
+def filter_choices(data):
+    # Segment options, date picker bounds and data scope text for a snapshot; None while it loads
+    if data is None:
+        return [{'label': 'All Segments', 'value': 'ALL'}], None, None, "Data Scope: Loading…"
+    first_date = data.first_date.astype('datetime64[D]').item() if data.first_date is not None else None
+    last_date = data.last_date.astype('datetime64[D]').item() if data.last_date is not None else None
+    options = [{'label': 'All Segments', 'value': 'ALL'}] + [{'label': seg, 'value': seg} for seg in data.client_segments]
+    scope = f"Data Scope: {first_date:%b %Y} – Present" if first_date is not None else "Data Scope: No Deals"
+    return options, first_date, last_date, scope
+
+def build_layout(data):
+    # data is None under DEFERRED_STARTUP until the first snapshot loads: the page
+    # then ships without figures and every tab renders through its callback
+    options, first_date, last_date, scope = filter_choices(data)
+    # In clientside mode the page carries the tab 1 inputs, read by assets/overview.js
+    overview_store = [dcc.Store(id='overview-store', data=cached_outputs(data, ('overview_store', ALL_DATES), build_overview_store) if data else None)] if CLIENTSIDE_OVERVIEW else []
+    # The default view ships inside the layout with every tab marked as rendered,
+    # so a first visit paints without waiting on a callback
+    defaults, default_token = default_outputs(data) if data else ({}, None)
+    rendered_stores = [dcc.Store(id=f"{tab.replace('_', '-')}-rendered", data=default_token) for tab in TABS]
+    version_store = [dcc.Store(id='data-version', data=data.version if data else None)]
+
+    def graph(component_id):
+        figure = {'figure': defaults[component_id]} if component_id in defaults else {}
+        return dcc.Graph(id=component_id, config={'displayModeBar': False}, **figure)
+
+    return html.Div(overview_store + rendered_stores + version_store + [
+        html.Div([
+            html.Img(src="/assets/whitelabel.png", style={"width": "100%", "marginBottom": "40px"}), 
+            html.P(scope, id='data-scope',
+                style={"fontSize": "12px", "color": "#8c7d55", "marginTop": "-30px", "marginBottom": "30px", "textAlign": "center"}),
+            html.H5("DASHBOARD FILTERS", style={"color": CHARCOAL, "letterSpacing": "2px", "fontSize": "14px"}),
+            html.Hr(),
+            html.P("Client Segment", className="small mb-1", style={"color": CHARCOAL}),
+            dcc.Dropdown(
+                id='client-segment-dropdown',
+                options=options,
+                multi=True,
+                value=['ALL'],
+                className="mb-4",
+                style={'fontSize': '12px'}
+            ),
+            html.P("Date Added", className="small mb-1", style={"color": CHARCOAL}),
+            dcc.DatePickerRange(
+                id='date-range',
+                min_date_allowed=first_date,
+                max_date_allowed=last_date,
+                start_date_placeholder_text="Start",
+                end_date_placeholder_text="End",
+                display_format="MMM D, YYYY",
+                clearable=True,
+                className="mb-4",
+                style={'fontSize': '12px'}
+            ),
+        ], style={
+            "position": "fixed", "top": 0, "left": 0, "bottom": 0,
+            "width": "18rem", "padding": "2rem 1rem", "backgroundColor": CREAM,
+            "borderRight": f"1px solid {GOLD}"
+        }),
+
+        html.Div([
+        dcc.Tabs(id='tabs', value='overview', children=[
+            # TAB 1: Client Segment Overview
+            dcc.Tab(label='Client Segment Overview', value='overview', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
+                dbc.Container([
+                    dbc.Row([
+                        dbc.Col(html.Div(id='kpi-overview-1', children=defaults.get('kpi-overview-1')), width=3),
+                        dbc.Col(html.Div(id='kpi-overview-2', children=defaults.get('kpi-overview-2')), width=3),
+                        dbc.Col(html.Div(id='kpi-overview-3', children=defaults.get('kpi-overview-3')), width=3),
+                        dbc.Col(html.Div(id='kpi-overview-4', children=defaults.get('kpi-overview-4')), width=3),
+                    ], className="mt-4 mb-4", style={"paddingLeft": "15px"}),
                 
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-1', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-1')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
                     
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-2', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-3', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-2')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-3')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
                     
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-4', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-5', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ]),
-            ], fluid=True)
-        ]),
-        # TAB 2: Segment Deep Dive
-        dcc.Tab(label='Segment Deep Dive', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
-            dbc.Container([
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-6', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-7', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-8', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-9', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4")
-            ], fluid=True)
-        ]),
-        # TAB 3: Opportunity Analysis
-        dcc.Tab(label='Opportunity Analysis', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
-            dbc.Container([
-                dbc.Row([
-                    dbc.Col([
-                        html.P("Focus Quadrant", className="small mb-1", style={"color": CHARCOAL, "marginTop": "20px"}),
-                        dcc.Dropdown(
-                            id='quadrant-filter',
-                            options=[
-                                {'label': 'All Quadrants', 'value': 'ALL'},
-                                {'label': 'Strategic Priority', 'value': 'Priority'},
-                                {'label': 'Revenue Leakage', 'value': 'Leakage'},
-                                {'label': 'Efficiency Wins', 'value': 'Efficiency'},
-                                {'label': 'Low ROI', 'value': 'LowROI'}
-                            ],
-                            value='ALL',
-                            clearable=False,
-                            style={'fontSize': '12px'}
-                        ),
-                    ], width=4)
-                ], className="mb-2"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-priority-matrix', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-lvi', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-                dbc.Row([
-                    dbc.Col(dbc.Card([
-                        dbc.CardBody([dcc.Graph(id='chart-missed-rev', config={'displayModeBar': False})])
-                    ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
-                ], className="mb-4"),
-
-            ], fluid=True)
-        ]),
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-4')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=6),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-5')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ]),
+                ], fluid=True)
+            ]),
+            # TAB 2: Segment Deep Dive
+            dcc.Tab(label='Segment Deep Dive', value='deep_dive', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
+                dbc.Container([
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-6')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-7')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-8')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-9')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4")
+                ], fluid=True)
+            ]),
+            # TAB 3: Opportunity Analysis
+            dcc.Tab(label='Opportunity Analysis', value='opportunity', style=TAB_STYLE, selected_style=TAB_SELECTED_STYLE, children=[
+                dbc.Container([
+                    dbc.Row([
+                        dbc.Col([
+                            html.P("Focus Quadrant", className="small mb-1", style={"color": CHARCOAL, "marginTop": "20px"}),
+                            dcc.Dropdown(
+                                id='quadrant-filter',
+                                options=[
+                                    {'label': 'All Quadrants', 'value': 'ALL'},
+                                    {'label': 'Strategic Priority', 'value': 'Priority'},
+                                    {'label': 'Revenue Leakage', 'value': 'Leakage'},
+                                    {'label': 'Efficiency Wins', 'value': 'Efficiency'},
+                                    {'label': 'Low ROI', 'value': 'LowROI'}
+                                ],
+                                value='ALL',
+                                clearable=False,
+                                style={'fontSize': '12px'}
+                            ),
+                        ], width=4)
+                    ], className="mb-2"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-priority-matrix')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-lvi')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                    dbc.Row([
+                        dbc.Col(dbc.Card([
+                            dbc.CardBody([graph('chart-missed-rev')])
+                        ], style={"border": "none", "boxShadow": "0 4px 6px rgba(0,0,0,0.15)"}), width=12),
+                    ], className="mb-4"),
+
+                ], fluid=True)
+            ]),
 
+        ])
+    ], style={"marginLeft": "18rem", "padding": "2rem", "backgroundColor": WHITE})
     ])
-], style={"marginLeft": "18rem", "padding": "2rem", "backgroundColor": WHITE})
-])
+
+if DEFERRED_STARTUP:
+    # A page served before the data loaded fills in its filters once it has
+    @app.callback(
+        Output('client-segment-dropdown', 'options'),
+        Output('date-range', 'min_date_allowed'),
+        Output('date-range', 'max_date_allowed'),
+        Output('data-scope', 'children'),
+        Output('data-version', 'data'),
+        Input('data-version', 'data')
+    )
+    @callback_metrics.track('update_filters')
+    def update_filters(version):
+        data = current_snapshot()
+        if version == data.version:
+            raise PreventUpdate
+        return filter_choices(data) + (data.version,)
 
 # Callback and function for Tab 1: Client Segment Overview
-@app.callback(
-    [Output('chart-1', 'figure'), Output('chart-2', 'figure'), Output('chart-3', 'figure'), Output('chart-4', 'figure'), Output('chart-5', 'figure'),
-     Output('kpi-overview-1', 'children'), Output('kpi-overview-2', 'children'), Output('kpi-overview-3', 'children'), Output('kpi-overview-4', 'children')],
-    Input('client-segment-dropdown', 'value')
-)
-def update_charts(selected_segments):
+OVERVIEW_OUTPUTS = [
+    Output('chart-1', 'figure'), Output('chart-2', 'figure'), Output('chart-3', 'figure'), Output('chart-4', 'figure'), Output('chart-5', 'figure'),
+    Output('kpi-overview-1', 'children'), Output('kpi-overview-2', 'children'), Output('kpi-overview-3', 'children'), Output('kpi-overview-4', 'children')
+]
+
+@callback_metrics.track('update_charts')
+def update_charts(selected_segments, start_date=None, end_date=None, active_tab='overview', rendered=None):
+    data = current_data(start_date, end_date)
+    token = tab_render_token('overview', active_tab, rendered, data, selected_segments)
+    key = ('overview', segment_key(selected_segments, data.client_segments), data.window)
+    return cached_outputs(data, key, build_overview_charts, selected_segments) + [token]
+
+if CLIENTSIDE_OVERVIEW:
+    app.clientside_callback(
+        ClientsideFunction(namespace='overview', function_name='render'),
+        OVERVIEW_OUTPUTS,
+        Input('client-segment-dropdown', 'value'),
+        Input('overview-store', 'data')
+    )
+
+    # The store carries one date window at a time; the initial one in the layout covers
+    # all dates, unless the page was served before the data loaded (see update_filters)
+    @app.callback(
+        Output('overview-store', 'data'),
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input('data-version', 'data'),
+        prevent_initial_call=True
+    )
+    @callback_metrics.track('update_overview_store')
+    def update_overview_store(start_date, end_date, version=None):
+        data = current_data(start_date, end_date)
+        return cached_outputs(data, ('overview_store', data.window), build_overview_store)
+else:
+    app.callback(
+        OVERVIEW_OUTPUTS + [Output('overview-rendered', 'data')],
+        Input('client-segment-dropdown', 'value'),
+        Input('date-range', 'start_date'),
+        Input('date-range', 'end_date'),
+        Input('tabs', 'value'),
+        State('overview-rendered', 'data')
+    )(update_charts)
+
+def build_overview_store(data):
+    # Per-segment table rows plus the cube partials the KPIs are summed from,
+    # and the 'All Segments' outputs used as templates by the browser
+    partials = data.segment_cube.groupby('client_segment')[['converted_revenue', 'lead_time_sum', 'lead_time_count']].sum()
+    rows = data.grouped_segments_df.merge(partials, left_on='client_segment', right_index=True, how='left')
+    outputs = build_overview_charts(data, ['ALL'])
+    empty = build_overview_charts(data, [])
+    return {
+        'rows': rows.to_dict('records'),
+        'figures': outputs[:5],
+        'kpis': outputs[5:],
+        'empty_figure': empty[0],
+        'empty_kpi': empty[5],
+    }
+
+def build_overview_charts(data, selected_segments):
     if not selected_segments: return [px.scatter(title="Select Segment")] * 5 + [html.Div()] * 4
-    if 'ALL' in selected_segments: selected_segments = client_segments
+    if 'ALL' in selected_segments: selected_segments = data.client_segments
     
-    df = grouped_segments_df[grouped_segments_df['client_segment'].isin(selected_segments)]
-    df_deals = deals_clean_df[deals_clean_df['client_segment'].isin(selected_segments)]
+    with callback_metrics.phase('filter'):
+        df = data.select('grouped_segments_df', selected_segments)
+        kpis = summarize(data.select('segment_cube', selected_segments))
 
     # Chart 1: Conversion Rate by Segment
     df1 = df.sort_values('conversion_rate', ascending=False)
@@ -311,36 +535,49 @@ def update_charts(selected_segments):
 
     kpi1 = html.Div([
         html.P("TOTAL REVENUE", className="small mb-0", style={"letterSpacing": "1px", "color": CHARCOAL}),
-        html.H4(f"${df_deals[df_deals['converted'] == True]['decimal_value'].sum():,.0f}", style={"color": CHARCOAL})
+        html.H4(f"${kpis['total_revenue']:,.0f}", style={"color": CHARCOAL})
     ])
     
     kpi2 = html.Div([
         html.P("AVG CONVERSION", className="small mb-0", style={"letterSpacing": "1px", "color": CHARCOAL}),
-        html.H4(f"{df_deals['converted'].mean():.1%}", style={"color": CHARCOAL})
+        html.H4(f"{kpis['conversion_rate']:.1%}", style={"color": CHARCOAL})
     ])
     
     kpi3 = html.Div([
         html.P("CONVERTED DEALS", className="small mb-0", style={"letterSpacing": "1px", "color": CHARCOAL}),
-        html.H4(f"{df['converted_deals'].sum():,}", style={"color": CHARCOAL})
+        html.H4(f"{kpis['converted_deals']:,}", style={"color": CHARCOAL})
     ])
     
     kpi4 = html.Div([
         html.P("AVG LEAD TIME", className="small mb-0", style={"letterSpacing": "1px", "color": CHARCOAL}),
-        html.H4(f"{df_deals['lead_time'].mean():.0f} Days", style={"color": CHARCOAL})
+        html.H4(f"{kpis['avg_lead_time']:.0f} Days", style={"color": CHARCOAL})
     ])
     
     return f1, f2, f3, f4, f5, kpi1, kpi2, kpi3, kpi4
 
 # Callback and function for Tab 2: Segment Deep Dive
 @app.callback(
-    [Output('chart-6', 'figure'), Output('chart-7', 'figure'), Output('chart-8', 'figure'), Output('chart-9', 'figure')],
-    Input('client-segment-dropdown', 'value')
+    [Output('chart-6', 'figure'), Output('chart-7', 'figure'), Output('chart-8', 'figure'), Output('chart-9', 'figure'),
+     Output('deep-dive-rendered', 'data')],
+    Input('client-segment-dropdown', 'value'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('tabs', 'value'),
+    State('deep-dive-rendered', 'data')
 )
-def update_deep_dive_charts(selected_segments):
+@callback_metrics.track('update_deep_dive_charts')
+def update_deep_dive_charts(selected_segments, start_date=None, end_date=None, active_tab='deep_dive', rendered=None):
+    data = current_data(start_date, end_date)
+    token = tab_render_token('deep_dive', active_tab, rendered, data, selected_segments)
+    key = ('deep_dive', segment_key(selected_segments, data.client_segments), data.window)
+    return cached_outputs(data, key, build_deep_dive_charts, selected_segments) + [token]
+
+def build_deep_dive_charts(data, selected_segments):
     if not selected_segments: return [px.scatter(title="Select Segment")] * 4
-    if 'ALL' in selected_segments: selected_segments = client_segments
+    if 'ALL' in selected_segments: selected_segments = data.client_segments
     
-    df = conv_rate_revenue_band[conv_rate_revenue_band['client_segment'].isin(selected_segments)]
+    with callback_metrics.phase('filter'):
+        df = data.select('conv_rate_revenue_band', selected_segments)
     
     # Chart 6: Conversion Rate per Deal Band per Segment
     f6 = apply_style(
@@ -413,38 +650,77 @@ def update_deep_dive_charts(selected_segments):
 
 # Callback and function for Tab 3: Opportunity Analysis
 @app.callback(
-    [Output('chart-priority-matrix', 'figure'), Output('chart-lvi', 'figure'), Output('chart-missed-rev', 'figure'),],
-    [Input('client-segment-dropdown', 'value'),
-     Input('quadrant-filter', 'value')]
+    [Output('chart-priority-matrix', 'figure'), Output('chart-lvi', 'figure'), Output('chart-missed-rev', 'figure'),
+     Output('opportunity-rendered', 'data')],
+    Input('client-segment-dropdown', 'value'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    Input('tabs', 'value'),
+    State('quadrant-filter', 'value'),
+    State('opportunity-rendered', 'data')
 )
-def update_opportunity_charts(selected_segments, selected_quad):
-    if not selected_segments: 
-        return [px.scatter(title="Select Segment")] * 3
-        
+@callback_metrics.track('update_opportunity_charts')
+def update_opportunity_charts(selected_segments, start_date=None, end_date=None, active_tab='opportunity', selected_quad='ALL', rendered=None):
+    data = current_data(start_date, end_date)
+    # Quadrant changes patch the visible matrix directly, so the token only tracks segments and dates
+    token = tab_render_token('opportunity', active_tab, rendered, data, selected_segments)
+    key = ('opportunity', segment_key(selected_segments, data.client_segments), data.window, selected_quad)
+    return cached_outputs(data, key, build_opportunity_charts, selected_segments, selected_quad) + [token]
+
+# A quadrant change only patches the matrix's points, axis ranges and annotations;
+# the heatmap and missed-revenue charts do not depend on the quadrant
+@app.callback(
+    Output('chart-priority-matrix', 'figure', allow_duplicate=True),
+    Input('quadrant-filter', 'value'),
+    State('client-segment-dropdown', 'value'),
+    State('date-range', 'start_date'),
+    State('date-range', 'end_date'),
+    prevent_initial_call=True
+)
+@callback_metrics.track('update_priority_quadrant')
+def update_priority_quadrant(selected_quad, selected_segments, start_date=None, end_date=None):
+    if not selected_segments:
+        return no_update
+    data = current_data(start_date, end_date)
+    key = ('priority_matrix', segment_key(selected_segments, data.client_segments), data.window, selected_quad)
+    matrix = cached_outputs(data, key, build_priority_matrix_only, selected_segments, selected_quad)
+
+    patched = Patch()
+    patched['data'] = matrix['data']
+    patched['layout']['annotations'] = matrix['layout']['annotations']
+    patched['layout']['xaxis']['range'] = matrix['layout']['xaxis']['range']
+    patched['layout']['yaxis']['range'] = matrix['layout']['yaxis']['range']
+    return patched
+
+def opportunity_df(data, selected_segments):
     if 'ALL' in selected_segments: 
-        selected_segments = client_segments
-    
-    df = conv_rate_revenue_band[conv_rate_revenue_band['client_segment'].isin(selected_segments)].copy()
-    df['revenue_per_lead'] = df['total_revenue_segment'] / df['total_deals']
-    
-    x_mid, x_max = 50.0, 100.0
-    y_mid = df['revenue_per_lead'].max() / 2 if not df.empty else 1
-    y_max = df['revenue_per_lead'].max() * 1.2 if not df.empty else 1000
-
-    x_range, y_range = [0, x_max], [0, y_max]
-
-    if selected_quad == 'Priority':
-        df = df[(df['conversion_rate'] >= x_mid) & (df['revenue_per_lead'] >= y_mid)]
-        x_range, y_range = [x_mid, x_max], [y_mid, y_max]
-    elif selected_quad == 'Leakage':
-        df = df[(df['conversion_rate'] < x_mid) & (df['revenue_per_lead'] >= y_mid)]
-        x_range, y_range = [0, x_mid], [y_mid, y_max]
-    elif selected_quad == 'Efficiency':
-        df = df[(df['conversion_rate'] >= x_mid) & (df['revenue_per_lead'] < y_mid)]
-        x_range, y_range = [x_mid, x_max], [0, y_mid]
-    elif selected_quad == 'LowROI':
-        df = df[(df['conversion_rate'] < x_mid) & (df['revenue_per_lead'] < y_mid)]
-        x_range, y_range = [0, x_mid], [0, y_mid]
+        selected_segments = data.client_segments
+
+    with callback_metrics.phase('filter'):
+        df = data.select('conv_rate_revenue_band', selected_segments).copy()
+        df['revenue_per_lead'] = df['total_revenue_segment'] / df['total_deals']
+    return df
+
+def build_priority_matrix(df, selected_quad):
+    with callback_metrics.phase('filter'):
+        x_mid, x_max = 50.0, 100.0
+        y_mid = df['revenue_per_lead'].max() / 2 if not df.empty else 1
+        y_max = df['revenue_per_lead'].max() * 1.2 if not df.empty else 1000
+
+        x_range, y_range = [0, x_max], [0, y_max]
+
+        if selected_quad == 'Priority':
+            df = df[(df['conversion_rate'] >= x_mid) & (df['revenue_per_lead'] >= y_mid)]
+            x_range, y_range = [x_mid, x_max], [y_mid, y_max]
+        elif selected_quad == 'Leakage':
+            df = df[(df['conversion_rate'] < x_mid) & (df['revenue_per_lead'] >= y_mid)]
+            x_range, y_range = [0, x_mid], [y_mid, y_max]
+        elif selected_quad == 'Efficiency':
+            df = df[(df['conversion_rate'] >= x_mid) & (df['revenue_per_lead'] < y_mid)]
+            x_range, y_range = [x_mid, x_max], [0, y_mid]
+        elif selected_quad == 'LowROI':
+            df = df[(df['conversion_rate'] < x_mid) & (df['revenue_per_lead'] < y_mid)]
+            x_range, y_range = [0, x_mid], [0, y_mid]
 
     # Chart 10: Deal Band Priority Matrix
     f10 = px.scatter(
@@ -524,7 +800,20 @@ def update_opportunity_charts(selected_segments, selected_quad):
         dtick=10000,
         nticks=0 
     )
-    
+
+    return f10
+
+def build_priority_matrix_only(data, selected_segments, selected_quad):
+    return build_priority_matrix(opportunity_df(data, selected_segments), selected_quad)
+
+def build_opportunity_charts(data, selected_segments, selected_quad):
+    if not selected_segments: 
+        return [px.scatter(title="Select Segment")] * 3
+
+    df = opportunity_df(data, selected_segments)
+    f10 = build_priority_matrix(df, selected_quad)
+
+    # Chart 11: Lead Value Index
     heatmap_df = df.pivot(index='client_segment', columns='deal_band', values='expected_value')
     heatmap_df = heatmap_df.reindex(columns=[b for b in BAND_ORDER if b in heatmap_df.columns])
     
@@ -552,5 +841,61 @@ def update_opportunity_charts(selected_segments, selected_quad):
 
     return f10, f11, f12
 
+# Serialized, gzipped layouts by data version; the live one and one being warmed are kept
+layout_payloads = OrderedDict()
+
+def layout_payload(data):
+    payload = layout_payloads.get(data.version)
+    if payload is None:
+        payload = CompressedPayload(build_layout(data))
+        layout_payloads[data.version] = payload
+        while len(layout_payloads) > 2:
+            layout_payloads.popitem(last=False)
+    return payload
+
+LAYOUT_PATH = app.config.routes_pathname_prefix + '_dash-layout'
+
+# Registered after dash_auth's check, so only authorised requests get here
+@server.before_request
+def serve_precompressed_layout():
+    # The layout without data is cheap to build and only served until the first snapshot loads
+    if request.method == 'GET' and request.path == LAYOUT_PATH and data_ready.is_set():
+        return layout_payload(data_refresher.current).response(request)
+
+def warm_default_view(data):
+    # Render the default 'All Segments' view and the compressed layout carrying it before the snapshot goes live
+    figure_cache.set_version(data.version)
+    layout_payload(data)
+
+def load_data():
+    # The heavy imports, the first snapshot and its default view; callbacks are released once done
+    global px, summarize, data_refresher, BAND_ORDER
+    import plotly.express as px
+    from aggregates import summarize, BAND_ORDER
+    from dashboard_data import DataRefresher
+
+    data_refresher = DataRefresher(shared_dir=SHARED_DATA_DIR)
+    warm_default_view(data_refresher.current)
+    data_refresher.on_refresh.append(warm_default_view)
+    data_refresher.start()
+    data_ready.set()
+
+def load_data_in_background():
+    while True:
+        try:
+            load_data()
+            return
+        except Exception:
+            server.logger.exception("Loading dashboard data failed; retrying in 10s")
+            time.sleep(10)
+
+# Assigned last: Dash renders the layout right away, which builds the default view
+if not DEFERRED_STARTUP:
+    load_data()
+app.layout = serve_layout
+
+if DEFERRED_STARTUP:
+    threading.Thread(target=load_data_in_background, name='load-data', daemon=True).start()
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,71 @@
+// Clientside rendering of tab 1 (CLIENTSIDE_OVERVIEW=1). The overview-store holds
+// one row per client segment and the server-built 'All Segments' figures and KPI
+// cards; a selection only filters and sorts the rows and refills those templates.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    overview: {
+        render: function(selected, store) {
+            if (!store) {
+                return window.dash_clientside.no_update;
+            }
+            if (!selected || selected.length === 0) {
+                return Array(5).fill(store.empty_figure).concat(Array(4).fill(store.empty_kpi));
+            }
+
+            var rows = store.rows;
+            if (selected.indexOf('ALL') === -1) {
+                rows = rows.filter(function(row) { return selected.indexOf(row.client_segment) !== -1; });
+            }
+
+            // Descending like DataFrame.sort_values(ascending=False), missing values last
+            function sortedBy(column) {
+                return rows.slice().sort(function(a, b) {
+                    var x = a[column], y = b[column];
+                    if (x === null) { return y === null ? 0 : 1; }
+                    if (y === null) { return -1; }
+                    return y - x;
+                });
+            }
+            function pluck(list, column) {
+                return list.map(function(row) { return row[column]; });
+            }
+            function withTraces(figure, traces) {
+                var data = figure.data.map(function(trace, i) { return Object.assign({}, trace, traces[i]); });
+                return Object.assign({}, figure, {data: data});
+            }
+
+            var figures = ['conversion_rate', 'avg_lead_time', 'avg_deal_size', 'segment_revenue'].map(function(column, i) {
+                var ordered = sortedBy(column);
+                return withTraces(store.figures[i], [{x: pluck(ordered, 'client_segment'), y: pluck(ordered, column)}]);
+            });
+            var shares = sortedBy('percent_total_revenue');
+            figures.push(withTraces(store.figures[4], [
+                {x: pluck(shares, 'pct_total_deals'), y: pluck(shares, 'client_segment')},
+                {x: pluck(shares, 'percent_total_revenue'), y: pluck(shares, 'client_segment')}
+            ]));
+
+            function total(column) {
+                return rows.reduce(function(sum, row) { return sum + (row[column] || 0); }, 0);
+            }
+            // Python's format() prints 'nan' where a ratio has no denominator
+            function fixed(value, digits) {
+                return isFinite(value) ? value.toFixed(digits) : 'nan';
+            }
+            function grouped(value) {
+                return isFinite(value) ? Math.round(value).toLocaleString('en-US') : 'nan';
+            }
+            var kpiText = [
+                '$' + grouped(total('converted_revenue')),
+                fixed(total('converted_deals') / total('total_deals') * 100, 1) + '%',
+                grouped(total('converted_deals')),
+                fixed(total('lead_time_sum') / total('lead_time_count'), 0) + ' Days'
+            ];
+            var kpis = store.kpis.map(function(card, i) {
+                var value = Object.assign({}, card.props.children[1]);
+                value.props = Object.assign({}, value.props, {children: kpiText[i]});
+                return Object.assign({}, card, {props: Object.assign({}, card.props, {children: [card.props.children[0], value]})});
+            });
+
+            return figures.concat(kpis);
+        }
+    }
+});
@@ -0,0 +1,172 @@
+"""
+Benchmarks the single-pass aggregation engine (aggregates.py) against the
+previous multi-pass groupby/merge implementation on synthetic cleaned deals.
+
+Run from the repository root:
+    python -m benchmarks.bench_aggregation --deals 1000000
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from aggregates import BAND_ORDER, build_segment_cube, segment_table, band_table
+
+SEGMENTS = [
+    "Catering Company/Florist", "Conference or Trade Show", "Creative Agency or Media Company",
+    "Event Designer Planning and Production", "In-house Company", "Photo", "Social No Planner", "Venue"
+]
+
+def synthetic_clean_deals(n_deals, seed=0):
+    """
+    Generates cleaned deals with the columns the aggregations read.
+
+    Parameters:
+    - n_deals: number of rows.
+    - seed: random seed.
+    """
+    rng = np.random.default_rng(seed)
+    segments = np.array(SEGMENTS + [np.nan], dtype=object)
+    weights = np.r_[np.full(len(SEGMENTS), 0.98 / len(SEGMENTS)), 0.02]
+    decimal_value = np.round(rng.lognormal(8.3, 1.0, n_deals), 2)
+    lead_time = rng.integers(-30, 365, n_deals).astype(float)
+    lead_time[rng.random(n_deals) < 0.01] = np.nan
+    return pd.DataFrame({
+        'client_segment': rng.choice(segments, n_deals, p=weights),
+        'converted': rng.random(n_deals) < 0.55,
+        'decimal_value': decimal_value,
+        'lead_time': lead_time,
+        'deal_band': pd.cut(decimal_value, bins=[0, 5000, 10000, 20000, 30000, float('inf')],
+                            labels=BAND_ORDER, include_lowest=True),
+    })
+
+# Previous implementation, kept as the baseline for timings and output checks
+
+def legacy_grouped_segments_df(deals):
+
+    """    
+    Creates a grouped DataFrame summarizing key metrics by client segment.   
+
+    Parameters:
+    - deals: DataFrame containing cleaned deals data.
+    """ 
+
+    # Base Stats 
+    grouped = deals.groupby('client_segment')['converted'].agg(['sum', 'count']).reset_index()
+    grouped.rename(columns={'count': 'total_deals', 'sum': 'converted_deals'}, inplace=True)
+    
+    # Conversion Rate
+    grouped['conversion_rate'] = (grouped['converted_deals'] / grouped['total_deals']).round(2)
+    
+    # Overall Percentages
+    total_deals_overall = grouped['total_deals'].sum()
+    grouped['pct_total_deals'] = ((grouped['total_deals'] / total_deals_overall) * 100).round(2)
+
+    # Revenue Calculations 
+    converted_only = deals[deals['converted'] == True]
+    total_rev_overall = converted_only['decimal_value'].sum() 
+    
+    rev_stats = converted_only.groupby('client_segment')['decimal_value'].agg(['sum', 'mean']).reset_index()
+    rev_stats.rename(columns={'sum': 'segment_revenue', 'mean': 'avg_deal_size'}, inplace=True)
+    
+    # Lead Time Calculation 
+    lead_stats = deals.groupby('client_segment')['lead_time'].mean().reset_index()
+    lead_stats.rename(columns={'lead_time': 'avg_lead_time'}, inplace=True)
+
+    final_df = grouped.merge(rev_stats, on='client_segment', how='left')
+    final_df = final_df.merge(lead_stats, on='client_segment', how='left')
+
+    final_df['percent_total_revenue'] = ((final_df['segment_revenue'] / total_rev_overall) * 100).round(2)
+    final_df['segment_revenue'] = final_df['segment_revenue'].fillna(0).round()
+    final_df['avg_deal_size'] = final_df['avg_deal_size'].fillna(0).round()
+    final_df['avg_lead_time'] = final_df['avg_lead_time'].round(1)
+
+    return final_df
+
+def legacy_conv_rate_revenue_band(deals):
+    """                                                             
+    Creates a detailed DataFrame summarizing conversion rates and revenue by client segment and deal band.  
+
+    Parameters: 
+
+    - deals: DataFrame containing cleaned deals data.
+    """ 
+
+    # Calculate overall total revenue from converted deals
+    total_rev_overall = deals[deals['converted'] == True]['decimal_value'].sum()
+
+    # Grouping for Base Stats
+    conv_rate_band_segments = deals.groupby(['client_segment', 'deal_band'], observed=False)['converted'].agg(['sum', 'count']).reset_index()
+    conv_rate_band_segments.rename(columns={'sum': 'converted_deals', 'count': 'total_deals'}, inplace=True)
+    
+    # Calculate conversion rate
+    conv_rate_band_segments['conversion_rate'] = (conv_rate_band_segments['converted_deals'] / conv_rate_band_segments['total_deals'] * 100).fillna(0)
+
+    # Revenue per Segment and Band
+    converted_only = deals[deals['converted'] == True].copy()
+    pctrevenue_band = converted_only.groupby(['client_segment', 'deal_band'], observed=False).agg({
+        'decimal_value': 'sum'
+    }).reset_index()
+    pctrevenue_band.rename(columns={'decimal_value': 'total_revenue_segment'}, inplace=True)
+    
+    # Calculate percent of total revenue
+    pctrevenue_band['percent_total_revenue'] = (pctrevenue_band['total_revenue_segment'] / total_rev_overall * 100).round(4)
+
+    # Merge and calculate mix
+    final_df = conv_rate_band_segments.merge(pctrevenue_band, on=['client_segment', 'deal_band'], how='left')
+    final_df['total_revenue_segment'] = final_df['total_revenue_segment'].fillna(0)
+
+    # Revenue Mix within segment
+    final_df['percent_rev_within_segment'] = final_df.groupby('client_segment')['percent_total_revenue'].transform(
+        lambda x: (x / x.sum() * 100) if x.sum() > 0 else 0
+    ).round(2)
+
+    # Expected Value and Average Size
+    final_df['avg_deal_size'] = (final_df['total_revenue_segment'] / final_df['converted_deals']).replace([np.inf, -np.inf], 0).fillna(0)
+    final_df['expected_value'] = ((final_df['conversion_rate'] / 100) * final_df['avg_deal_size']).round(2)
+
+    # Missed Opportunities
+    missed_deals = deals[deals['converted'] == False]
+    missed_stats = missed_deals.groupby(['client_segment', 'deal_band'], observed=False).agg(
+        missed_revenue=('decimal_value', 'sum'),
+        missed_deal_count=('decimal_value', 'count')
+    ).reset_index()
+
+    final_df = final_df.merge(missed_stats, on=['client_segment', 'deal_band'], how='left')
+    final_df[['missed_revenue', 'missed_deal_count']] = final_df[['missed_revenue', 'missed_deal_count']].fillna(0)
+    
+    return final_df
+
+def best_of(fn, deals, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(deals)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+def run(n_deals, repeat=3):
+    deals = synthetic_clean_deals(n_deals)
+
+    def engine(deals):
+        cube = build_segment_cube(deals)
+        return segment_table(cube), band_table(cube)
+
+    def legacy(deals):
+        return legacy_grouped_segments_df(deals), legacy_conv_rate_revenue_band(deals)
+
+    legacy_time, (legacy_segments, legacy_bands) = best_of(legacy, deals, repeat)
+    engine_time, (segments, bands) = best_of(engine, deals, repeat)
+
+    pd.testing.assert_frame_equal(legacy_segments.astype({'client_segment': str}), segments, check_exact=False)
+    pd.testing.assert_frame_equal(legacy_bands.astype({'client_segment': str}), bands, check_exact=False)
+
+    print(f"{n_deals:,} deals: legacy {legacy_time * 1000:.1f} ms, single pass {engine_time * 1000:.1f} ms "
+          f"({legacy_time / engine_time:.1f}x), outputs match")
+    return {'deals': n_deals, 'legacy_seconds': legacy_time, 'engine_seconds': engine_time}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.deals, args.repeat)
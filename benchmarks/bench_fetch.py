@@ -0,0 +1,66 @@
+"""
+Measures extraction throughput of data_manager.fetch_data against the local
+mock Sell API for several prefetch depths, and checks every record arrived.
+With --async, the asyncio client (sell_async) is run at the same depths and
+its items are checked against fetch_data's.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch --deals 20000 --prefetch 1 2 4 8 --latency 0.05 --rate-limit 0.01
+    python -m benchmarks.bench_fetch --deals 20000 --prefetch 4 --latency 0.05 --async
+"""
+import asyncio
+import logging
+import argparse
+import requests
+import data_manager as dm
+from benchmarks.synthetic import generate_crm
+from sell_async import AsyncSellClient
+from benchmarks.mock_sell import create_app, serve, add_fault_arguments, faults_from_args
+
+def report(label, depth, dataset, stats, n_items, expected):
+    rate = stats['pages'] / stats['seconds'] if stats['seconds'] else 0
+    missing = expected - n_items
+    print(f"{label:<6} prefetch={depth:<3} {dataset:<9} {stats['pages']:>5} pages {stats['bytes'] / 1e6:>7.2f} MB "
+          f"{stats['seconds']:>7.2f}s {rate:>8.1f} pages/s"
+          + (f"  MISSING {missing} of {expected} records" if missing else ""))
+
+async def fetch_async(dataset, depth, stats):
+    async with AsyncSellClient(concurrency=depth) as client:
+        return await client.fetch_data(dataset, stats)
+
+def run(n_deals, prefetch_depths, faults, seed=0, use_async=False):
+    deals, contacts, stages = generate_crm(n_deals, seed=seed)
+    expected = {'deals': len(deals), 'contacts': len(contacts), 'stages': len(stages)}
+    server = serve(create_app({'deals': deals, 'contacts': contacts, 'stages': stages}, faults))
+    dm.API_BASE_URL = f"http://127.0.0.1:{server.server_port}/v2"
+    try:
+        for depth in prefetch_depths:
+            dm.PREFETCH_PAGES = depth
+            for dataset in ['deals', 'contacts']:
+                session = requests.Session()
+                session.headers.update(dm.HEADERS)
+                session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=depth))
+                stats = {}
+                items = dm.fetch_data(dataset, session, stats)
+                report("sync", depth, dataset, stats, len(items), expected[dataset])
+                if use_async:
+                    stats = {}
+                    async_items = asyncio.run(fetch_async(dataset, depth, stats))
+                    report("async", depth, dataset, stats, len(async_items), expected[dataset])
+                    if async_items != items:
+                        print(f"async  prefetch={depth:<3} {dataset:<9} DIFFERS from fetch_data")
+        print("Mock responses:", requests.get(f"http://127.0.0.1:{server.server_port}/_mock/stats").json()['responses'])
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefetch", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--async", dest="use_async", action="store_true", help="also run the asyncio client and compare its items")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    run(args.deals, args.prefetch, faults_from_args(args), args.seed, args.use_async)
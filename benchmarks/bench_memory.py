@@ -0,0 +1,63 @@
+"""
+Compares the deal table as the dashboard used to hold it (the whole CSV with
+default dtypes) against the compact frame it holds now (DEALS_COLUMNS through
+compact_frame): memory used and the time of a multi-segment filter done on
+strings versus on category codes.
+
+Run from the repository root:
+    python -m benchmarks.bench_memory --deals 100000 1000000
+"""
+import io
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import data_store
+from dashboard_data import DEALS_COLUMNS
+from data_store import compact_frame
+
+def best_of(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def compare(label, legacy):
+    compact = compact_frame(legacy[DEALS_COLUMNS])
+    segments = sorted(legacy['client_segment'].dropna().unique())
+    selected = segments[:3]
+
+    strings = legacy['client_segment']
+    codes = compact['client_segment'].cat.codes.to_numpy()
+    selected_codes = compact['client_segment'].cat.categories.get_indexer(selected)
+    assert np.array_equal(strings.isin(selected).to_numpy(), np.isin(codes, selected_codes))
+
+    legacy_mb = legacy.memory_usage(deep=True).sum() / 1e6
+    compact_mb = compact.memory_usage(deep=True).sum() / 1e6
+    string_ms = best_of(lambda: strings.isin(selected)) * 1000
+    code_ms = best_of(lambda: np.isin(codes, selected_codes)) * 1000
+
+    print(f"{label}: {len(legacy):,} deals")
+    print(f"  memory   legacy {legacy_mb:9.2f} MB  compact {compact_mb:8.2f} MB  ({legacy_mb / compact_mb:.0f}x smaller)")
+    print(f"  isin     strings {string_ms:8.3f} ms  codes {code_ms:10.3f} ms  ({string_ms / code_ms:.1f}x faster)")
+
+def legacy_from_clean(deals):
+    # What the dashboard used to hold: the CSV artifact read back with default dtypes
+    buffer = io.StringIO()
+    deals.to_csv(buffer, index=False)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, nargs="*", default=[100_000], help="synthetic sizes to add to the sample data")
+    args = parser.parse_args()
+
+    compare("sample data", pd.read_csv(data_store.table_path("deals_clean", "csv")))
+    if args.deals:
+        from benchmarks.synthetic import generate_crm
+        from data_manager import clean_deals
+        for n_deals in args.deals:
+            compare("synthetic", legacy_from_clean(clean_deals(*generate_crm(n_deals))))
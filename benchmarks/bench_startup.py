@@ -0,0 +1,114 @@
+"""
+Measures how long the dashboard takes to come up, with and without
+DEFERRED_STARTUP: time to `import app`, to the first /healthz and layout
+responses, and until the data is loaded, each in a fresh interpreter. Also
+breaks the import down by top-level package (python -X importtime), so a
+dependency that starts loading at import shows up by name. Results use the
+benchmarks.run format and can be compared the same way.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --compare benchmarks/results/<earlier>.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from collections import defaultdict
+import pandas as pd
+from benchmarks.run import RESULTS_DIR, environment, compare
+
+# Run in the child; times count from the parent starting the interpreter
+CHILD = """
+import os, json, time, base64
+import app
+imported = time.time()
+client = app.server.test_client()
+healthz = client.get('/healthz')
+healthz_at = time.time()
+layout = client.get('/_dash-layout', headers={'Authorization': 'Basic ' + base64.b64encode(b'admin:demo').decode()})
+layout_at = time.time()
+app.data_ready.wait()
+ready_at = time.time()
+assert healthz.status_code == 200 and layout.status_code == 200
+started = float(os.environ['STARTUP_T0'])
+print(json.dumps({'import': imported - started, 'healthz': healthz_at - started,
+                  'layout': layout_at - started, 'data_ready': ready_at - started}))
+"""
+
+def child_env(deferred):
+    env = dict(os.environ, DEFERRED_STARTUP='1' if deferred else '0', DATA_REFRESH_SECONDS='0')
+    env.pop('SHARED_DATA_DIR', None)
+    return env
+
+def startup_times(deferred, repeat):
+    # Best of repeat for each milestone
+    best = {}
+    for _ in range(repeat):
+        env = child_env(deferred)
+        env['STARTUP_T0'] = repr(time.time())
+        output = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True).stdout
+        for milestone, seconds in json.loads(output.splitlines()[-1]).items():
+            best[milestone] = min(seconds, best.get(milestone, seconds))
+    return best
+
+def import_breakdown(repeat):
+    """
+    Returns the seconds `import app` spends in each top-level package (own
+    modules plus submodules, from -X importtime self times), best of repeat.
+    Runs without DEFERRED_STARTUP so everything loads in the one thread; the
+    time of app itself is its module body, i.e. loading and warming the data.
+
+    Parameters:
+    - repeat: number of runs.
+    """
+    best = None
+    for _ in range(repeat):
+        stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], env=child_env(False),
+                                capture_output=True, text=True, check=True).stderr
+        totals = defaultdict(float)
+        for line in stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            totals[name.strip().split('.')[0]] += int(self_us) / 1e6
+        best = dict(totals) if best is None else {name: min(seconds, best.get(name, seconds)) for name, seconds in totals.items()}
+    return best
+
+def run(repeat, top):
+    results = []
+    for deferred in (False, True):
+        mode = 'deferred' if deferred else 'eager'
+        times = startup_times(deferred, repeat)
+        print(f"{mode:<9} " + "  ".join(f"{milestone} {seconds:6.2f}s" for milestone, seconds in times.items()))
+        results += [{'size': 0, 'stage': f"startup/{mode}/{milestone}", 'seconds': seconds} for milestone, seconds in times.items()]
+
+    packages = sorted(import_breakdown(repeat).items(), key=lambda item: -item[1])
+    print(f"import app {sum(seconds for _, seconds in packages):.2f}s:")
+    for name, seconds in packages[:top]:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    results += [{'size': 0, 'stage': f"import/{name}", 'seconds': seconds} for name, seconds in packages[:top]]
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=20, help="packages listed in the import breakdown")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/startup-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    document = {'environment': environment(), 'results': run(args.repeat, args.top)}
+
+    output = args.output or os.path.join(RESULTS_DIR, "startup-" + pd.Timestamp.now().strftime('%Y%m%d-%H%M%S') + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(json.load(f), document, args.threshold) else 0)
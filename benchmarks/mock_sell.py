@@ -0,0 +1,177 @@
+"""
+Local stand-in for the Sell API serving synthetic deals, contacts and stages
+with the API's page/per_page pagination and meta.links.next_page, plus optional
+latency, 429 and 5xx injection.
+
+Run from the repository root, then point the ETL at it:
+    python -m benchmarks.mock_sell --deals 100000 --port 8765 --latency 0.05 --rate-limit 0.02 --errors 0.01
+    SELL_API_URL=http://127.0.0.1:8765/v2 python data_manager.py --full
+"""
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from flask import Flask, jsonify, request
+from werkzeug.serving import make_server
+from benchmarks.synthetic import generate_crm, to_items
+
+ITEM_TYPES = {'deals': 'deal', 'contacts': 'contact', 'stages': 'stage'}
+MAX_PER_PAGE = 100
+
+class Faults:
+    """
+    Failure and latency settings applied to every collection request.
+
+    Parameters:
+    - latency: base seconds added to each response.
+    - jitter: extra random seconds, uniform in [0, jitter].
+    - rate_limit: probability of answering 429 with a Retry-After header.
+    - errors: probability of answering 500, 502 or 503.
+    - retry_after: Retry-After value sent with injected 429s.
+    - quota: requests allowed per second before X-RateLimit-Remaining hits 0 and
+      further requests get 429; 0 disables the quota.
+    - seed: seeds the fault draws so a run can be repeated.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=0.0, errors=0.0, retry_after=1, quota=0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.errors = errors
+        self.retry_after = retry_after
+        self.quota = quota
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+
+    def draw(self):
+        with self._lock:
+            return self._rng.random(), self._rng.random(), self._rng.choice([500, 502, 503])
+
+    def take_quota(self):
+        # Returns (allowed, remaining, seconds until the window resets)
+        now = time.time()
+        with self._lock:
+            second, used = self._window
+            if int(now) != second:
+                second, used = int(now), 0
+            used += 1
+            self._window = (second, used)
+        return used <= self.quota, max(self.quota - used, 0), second + 1 - now
+
+def create_app(datasets, faults=None):
+    """
+    Builds the mock API as a Flask app serving /v2/<dataset>.
+
+    Parameters:
+    - datasets: dict of collection name -> DataFrame, e.g. from generate_crm.
+    - faults: optional Faults; defaults to no latency and no failures.
+    """
+    faults = faults or Faults()
+    items = {name: to_items(df, ITEM_TYPES.get(name, name.rstrip('s'))) for name, df in datasets.items()}
+    newest_first = {
+        name: sorted(records, key=lambda item: item['data']['updated_at'], reverse=True)
+        for name, records in items.items() if 'updated_at' in datasets[name].columns
+    }
+    counts = Counter()
+    counts_lock = threading.Lock()
+
+    app = Flask(__name__)
+
+    def respond(status, body, headers=None):
+        with counts_lock:
+            counts[status] += 1
+        response = jsonify(body)
+        response.status_code = status
+        response.headers.update(headers or {})
+        return response
+
+    @app.route('/v2/<dataset>')
+    def collection(dataset):
+        if not request.headers.get('Authorization', '').startswith('Bearer '):
+            return respond(401, {'errors': [{'error': {'code': 'unauthorized'}}]})
+        if dataset not in items:
+            return respond(404, {'errors': [{'error': {'code': 'not_found'}}]})
+
+        delay = faults.latency + (random.uniform(0, faults.jitter) if faults.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        headers = {}
+        if faults.quota:
+            allowed, remaining, reset = faults.take_quota()
+            headers = {'X-RateLimit-Limit': str(faults.quota), 'X-RateLimit-Remaining': str(remaining),
+                       'X-RateLimit-Reset': f"{reset:.3f}"}
+            if not allowed:
+                return respond(429, {'errors': [{'error': {'code': 'rate_limit_exceeded'}}]},
+                               {**headers, 'Retry-After': f"{reset:.3f}"})
+
+        limited, failed, error_status = faults.draw()
+        if limited < faults.rate_limit:
+            return respond(429, {'errors': [{'error': {'code': 'rate_limit_exceeded'}}]},
+                           {**headers, 'Retry-After': str(faults.retry_after)})
+        if failed < faults.errors:
+            return respond(error_status, {'errors': [{'error': {'code': 'server_error'}}]}, headers)
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 25, type=int), 1), MAX_PER_PAGE)
+        records = newest_first.get(dataset, items[dataset]) if request.args.get('sort_by') == 'updated_at:desc' else items[dataset]
+        start = (page - 1) * per_page
+        page_items = records[start:start + per_page]
+
+        base = f"{request.base_url}?per_page={per_page}"
+        if 'sort_by' in request.args:
+            base += f"&sort_by={request.args['sort_by']}"
+        links = {'self': f"{base}&page={page}", 'first_page': f"{base}&page=1"}
+        if page > 1:
+            links['prev_page'] = f"{base}&page={page - 1}"
+        if start + per_page < len(records):
+            links['next_page'] = f"{base}&page={page + 1}"
+        return respond(200, {'items': page_items, 'meta': {'type': 'collection', 'count': len(page_items), 'links': links}}, headers)
+
+    @app.route('/_mock/stats')
+    def stats():
+        with counts_lock:
+            return jsonify({'responses': {str(status): n for status, n in sorted(counts.items())},
+                            'records': {name: len(records) for name, records in items.items()}})
+
+    return app
+
+def serve(app, host='127.0.0.1', port=0):
+    """
+    Starts the mock on a background thread and returns the werkzeug server
+    (server.server_port has the bound port, server.shutdown() stops it).
+
+    Parameters:
+    - app: app returned by create_app.
+    - host, port: bind address; port 0 picks a free port.
+    """
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="mock-sell", daemon=True).start()
+    return server
+
+def add_fault_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per response")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="probability of a 429")
+    parser.add_argument("--errors", type=float, default=0.0, help="probability of a 5xx")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--quota", type=int, default=0, help="requests per second before 429s (0 = unlimited)")
+
+def faults_from_args(args):
+    return Faults(args.latency, args.jitter, args.rate_limit, args.errors, args.retry_after, args.quota, args.seed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--deals", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    deals, contacts, stages = generate_crm(args.deals, seed=args.seed)
+    app = create_app({'deals': deals, 'contacts': contacts, 'stages': stages}, faults_from_args(args))
+    print(f"Mock Sell API on http://{args.host}:{args.port}/v2 ({len(deals):,} deals, {len(contacts):,} contacts)")
+    make_server(args.host, args.port, app, threaded=True).serve_forever()
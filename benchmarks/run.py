@@ -0,0 +1,253 @@
+"""
+Benchmark suite for the ETL stages and the Dash callbacks on seeded synthetic
+CRM data. Each stage is timed (best of --repeat) and memory-profiled with
+tracemalloc in a separate pass; results are written as JSON so runs can be
+compared.
+
+Run from the repository root:
+    python -m benchmarks.run --sizes 10000 100000 1000000
+    python -m benchmarks.run --sizes 10000 --compare benchmarks/results/<earlier>.json
+"""
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# The dashboard must not start its file poller while the suite swaps data under it
+os.environ.setdefault("DATA_REFRESH_SECONDS", "0")
+
+import data_store
+import data_manager as dm
+from aggregates import build_segment_cube, segment_table, band_table
+from data_store import compact_frame
+from dashboard_data import DashboardData, DEALS_COLUMNS
+from queries import QueryEngine, NAMED_QUERIES
+from benchmarks.synthetic import generate_crm
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Processes for the clean_deals_parallel stage
+PARALLEL_WORKERS = min(4, os.cpu_count() or 1)
+
+def measure(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': min(timings), 'peak_mb': round(peak / 1e6, 2)}, result
+
+def etl_stages(deals, contacts, stages):
+    def chunks(df, size=dm.PER_PAGE):
+        return (df.iloc[i:i + size] for i in range(0, len(df), size))
+
+    state = {}
+
+    def clean():
+        state['clean'] = dm.clean_deals(deals, contacts, stages)
+        return state['clean']
+
+    def cube():
+        state['cube'] = build_segment_cube(state['clean'])
+        return state['cube']
+
+    def snapshot():
+        state['data'] = DashboardData(compact_frame(state['clean'][DEALS_COLUMNS]), 'bench')
+        return state['data']
+
+    def window():
+        # The middle half of the date range, starting and ending mid-month
+        first, last = state['data'].first_date, state['data'].last_date
+        return first + (last - first) // 4, last - (last - first) // 4
+
+    def window_rescan():
+        start, end = window()
+        added_at = state['data'].deals_clean_df['added_at']
+        return build_segment_cube(state['data'].deals_clean_df[(added_at >= start) & (added_at < end)])
+
+    def save():
+        categories = {col: 'category' for col in data_store.CATEGORY_COLUMNS if col in state['clean'].columns}
+        data_store.save_table("deals_clean", state['clean'].astype(categories))
+
+    return [
+        ('flatten_deal_custom_fields', lambda: dm.flatten_custom_fields(deals['custom_fields'])),
+        ('flatten_contact_custom_fields', lambda: dm.flatten_custom_fields(contacts['custom_fields'])),
+        ('clean_deals', clean),
+        ('clean_deals_stream', lambda: dm.clean_deals_stream(chunks(deals), chunks(contacts), stages)),
+        ('clean_deals_parallel', lambda: dm.clean_deals(deals, contacts, stages, workers=PARALLEL_WORKERS)),
+        ('build_segment_cube', cube),
+        ('segment_and_band_tables', lambda: (segment_table(state['cube']), band_table(state['cube']))),
+        ('named_queries', lambda: [QueryEngine(state['clean']).named(name) for name in NAMED_QUERIES]),
+        ('dashboard_snapshot', snapshot),
+        ('date_window_cube', lambda: state['data'].window_cube(*window())),
+        ('date_window_rescan', window_rescan),
+        ('save_deals_clean', save),
+        ('load_deals_clean_app_columns', lambda: data_store.load_table('deals_clean', columns=DEALS_COLUMNS)),
+    ]
+
+def _prop(component, value=None):
+    # "id.property", the property defaulting to value
+    component_id, _, prop = component.partition('.')
+    return {'id': component_id, 'property': prop or 'value', 'value': value}
+
+def callback_request(outputs, inputs, state=()):
+    ids = [{'id': output.split('.')[0], 'property': output.split('.', 1)[1]} for output in outputs]
+    inputs = [_prop(component, value) for component, value in inputs]
+    return {
+        'output': '..' + '...'.join(outputs) + '..' if len(outputs) > 1 else outputs[0],
+        'outputs': ids if len(outputs) > 1 else ids[0],
+        'inputs': inputs,
+        'changedPropIds': [f"{prop['id']}.{prop['property']}" for prop in inputs],
+        'state': [_prop(component, value) for component, value in state],
+    }
+
+def callback_cases(segments, callback_map, windows):
+    selections = {'all': ['ALL'], 'one_segment': segments[:1], 'three_segments': segments[:3]}
+    tab1 = [f'chart-{i}.figure' for i in range(1, 6)] + [f'kpi-overview-{i}.children' for i in range(1, 5)] + ['overview-rendered.data']
+    tab2 = [f'chart-{i}.figure' for i in range(6, 10)] + ['deep-dive-rendered.data']
+    tab3 = ['chart-priority-matrix.figure', 'chart-lvi.figure', 'chart-missed-rev.figure', 'opportunity-rendered.data']
+    # The quadrant callback writes a duplicate output, registered under a hashed id
+    quadrant_output = next(output for output in callback_map if output.startswith('chart-priority-matrix.figure@'))
+    for name, selection in selections.items():
+        for window_name, (start, end) in windows.items():
+            label = f'{name},{window_name}' if window_name else name
+            dates = [('date-range.start_date', start), ('date-range.end_date', end)]
+            # Each tab is timed as the open tab, with nothing rendered yet
+            yield f'update_charts[{label}]', callback_request(
+                tab1, [('client-segment-dropdown', selection)] + dates + [('tabs', 'overview')], [('overview-rendered.data', None)])
+            yield f'update_deep_dive_charts[{label}]', callback_request(
+                tab2, [('client-segment-dropdown', selection)] + dates + [('tabs', 'deep_dive')], [('deep-dive-rendered.data', None)])
+            yield f'update_opportunity_charts[{label}]', callback_request(
+                tab3, [('client-segment-dropdown', selection)] + dates + [('tabs', 'opportunity')],
+                [('quadrant-filter', 'ALL'), ('opportunity-rendered.data', None)])
+            yield f'update_priority_quadrant[{label}]', callback_request(
+                [quadrant_output], [('quadrant-filter', 'ALL')], [('client-segment-dropdown', selection)] + dates)
+
+def callback_stages(app_module, repeat):
+    client = app_module.server.test_client()
+    headers = {'Authorization': 'Basic ' + base64.b64encode(b'admin:demo').decode()}
+    data = app_module.data_refresher.current
+    # All dates, plus a window with partial months at both ends over the middle of the data
+    first, last = pd.Timestamp(data.first_date), pd.Timestamp(data.last_date)
+    windows = {'': (None, None), 'window': (str((first + (last - first) / 4).date()), str((last - (last - first) / 4).date()))}
+    results = []
+    for name, body in callback_cases(data.client_segments, app_module.app.callback_map, windows):
+        def post():
+            response = client.post('/_dash-update-component', json=body, headers=headers)
+            assert response.status_code == 200, response.status_code
+            return len(response.data)
+
+        def cold():
+            app_module.figure_cache.clear()
+            return post()
+
+        cold_stats, size = measure(cold, repeat)
+        warm_stats, _ = measure(post, repeat)
+        results.append({'stage': f'callback:{name}', **cold_stats, 'response_bytes': size})
+        results.append({'stage': f'callback:{name}:cached', **warm_stats, 'response_bytes': size})
+    return results
+
+def run(sizes, repeat, seed):
+    results = []
+    app_module = None
+    data_dir = tempfile.mkdtemp(prefix="bench-data-")
+    data_store.DATA_DIR = data_dir
+    try:
+        for size in sizes:
+            start = time.perf_counter()
+            deals, contacts, stages = generate_crm(size, seed=seed)
+            print(f"[{size:,} deals] generated in {time.perf_counter() - start:.1f}s")
+
+            for stage, fn in etl_stages(deals, contacts, stages):
+                stats, _ = measure(fn, repeat)
+                results.append({'size': size, 'stage': stage, **stats})
+                print(f"  {stage:<54} {stats['seconds'] * 1000:>10.1f} ms {stats['peak_mb']:>9.1f} MB")
+
+            # The app reads the deals_clean just saved by the ETL stages
+            if app_module is None:
+                import app as app_module
+            else:
+                app_module.data_refresher.refresh(force=True)
+            for row in callback_stages(app_module, repeat):
+                results.append({'size': size, **row})
+                print(f"  {row['stage']:<54} {row['seconds'] * 1000:>10.1f} ms {row['peak_mb']:>9.1f} MB {row['response_bytes']:>9} B")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': pd.Timestamp.now(tz='UTC').isoformat(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+def compare(baseline, current, threshold):
+    """
+    Prints stages that got slower than the baseline by more than threshold and
+    returns how many did.
+
+    Parameters:
+    - baseline, current: result documents written by this script.
+    - threshold: allowed relative slowdown, e.g. 0.25 for 25%.
+    """
+    before = {(r['size'], r['stage']): r for r in baseline['results']}
+    regressions = 0
+    for row in current['results']:
+        old = before.get((row['size'], row['stage']))
+        if old is None or not old['seconds']:
+            continue
+        change = row['seconds'] / old['seconds'] - 1
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {row['stage']} @ {row['size']:,}: "
+                  f"{old['seconds'] * 1000:.1f} ms -> {row['seconds'] * 1000:.1f} ms (+{change:.0%})")
+    print(f"{regressions} regression(s) against {baseline['environment'].get('commit')}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    # dash_auth warns on every request without a Flask secret key
+    logging.getLogger().setLevel(logging.ERROR)
+
+    document = {'environment': environment(), 'results': run(args.sizes, args.repeat, args.seed)}
+
+    output = args.output or os.path.join(RESULTS_DIR, pd.Timestamp.now().strftime('%Y%m%d-%H%M%S') + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            sys.exit(1 if compare(json.load(f), document, args.threshold) else 0)
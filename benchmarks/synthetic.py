@@ -0,0 +1,100 @@
+"""
+Seeded synthetic Sell CRM data in the API's shape: deals, contacts and stages
+with the fields clean_deals reads, including custom_fields as lists of
+name/value items.
+"""
+import numpy as np
+import pandas as pd
+
+STAGES = ['Incoming', 'Qualified', 'Quote Sent', 'Event Complete', 'Cancelled', 'Unqualified']
+
+# Raw segment names as entered in the CRM, including the ones clean_deals remaps or drops
+RAW_SEGMENTS = [
+    "Event Design Planning + Production", "Photo + Design", "In-House Company", "Catering Company",
+    "Conference + Trade Show Producter", "Trade Show Vendor", "Creative Agency or Media Company",
+    "Social No Planner", "Venue", "Stager", "Real Estate Broker"
+]
+CLIENT_TYPES = ['New Client', 'Repeat Client']
+
+def _timestamps(rng, n, start, end):
+    seconds = rng.integers(pd.Timestamp(start).value // 10**9, pd.Timestamp(end).value // 10**9, n)
+    return pd.to_datetime(seconds, unit='s', utc=True)
+
+def _iso(timestamps):
+    return timestamps.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _custom_fields(rng, n, fields):
+    # fields: dict of name -> (values array, presence probability); values become plain Python types
+    present = {name: rng.random(n) < p for name, (_, p) in fields.items()}
+    values = {name: np.asarray(v).tolist() for name, (v, _) in fields.items()}
+    return [
+        [{'name': name, 'value': values[name][i]} for name in fields if present[name][i]]
+        for i in range(n)
+    ]
+
+def generate_crm(n_deals, seed=0, contacts_per_deal=0.6):
+    """
+    Generates deals, contacts and stages DataFrames shaped like the `data` objects
+    returned by the Sell API.
+
+    Parameters:
+    - n_deals: number of deals.
+    - seed: random seed, the same seed always gives the same data.
+    - contacts_per_deal: contacts generated per deal.
+    """
+    rng = np.random.default_rng(seed)
+    n_contacts = max(int(n_deals * contacts_per_deal), 1)
+
+    stages = pd.DataFrame({'id': np.arange(1, len(STAGES) + 1), 'name': STAGES})
+
+    contact_segments = rng.choice(RAW_SEGMENTS, n_contacts)
+    contacts = pd.DataFrame({
+        'id': np.arange(1, n_contacts + 1) + 1_000_000,
+        'name': [f"Contact {i}" for i in range(n_contacts)],
+        'email': [f"contact{i}@example.com" for i in range(n_contacts)],
+        'updated_at': _iso(_timestamps(rng, n_contacts, '2020-01-01', '2025-12-31')),
+        'custom_fields': _custom_fields(rng, n_contacts, {
+            'Client Segment': (contact_segments, 0.9),
+        }),
+    })
+
+    added_at = _timestamps(rng, n_deals, '2020-01-01', '2025-12-31')
+    updated_at = added_at + pd.to_timedelta(rng.integers(0, 90 * 86400, n_deals), unit='s')
+    event_start = (added_at + pd.to_timedelta(rng.integers(-10, 240, n_deals), unit='D')).strftime('%Y-%m-%d')
+    values = np.round(rng.lognormal(8.3, 1.0, n_deals), 2).astype(str).astype(object)
+    values[rng.random(n_deals) < 0.02] = None
+
+    deals = pd.DataFrame({
+        'id': np.arange(1, n_deals + 1),
+        'name': [f"Deal {i}" for i in range(n_deals)],
+        'value': values,
+        'currency': 'USD',
+        'hot': rng.random(n_deals) < 0.1,
+        'stage_id': rng.choice(stages['id'], n_deals, p=[0.05, 0.05, 0.05, 0.5, 0.2, 0.15]),
+        'contact_id': rng.integers(1, n_contacts + 1, n_deals) + 1_000_000,
+        'owner_id': rng.integers(1, 8, n_deals),
+        'source_id': rng.integers(1, 20, n_deals),
+        'added_at': _iso(added_at),
+        'updated_at': _iso(updated_at),
+        'last_stage_change_at': _iso(updated_at),
+        'last_activity_at': _iso(updated_at),
+        'tags': [[] for _ in range(n_deals)],
+        'custom_fields': _custom_fields(rng, n_deals, {
+            'Client Segment': (rng.choice(RAW_SEGMENTS, n_deals), 0.5),
+            'Event Start': (event_start, 0.95),
+            'Client Type': (rng.choice(CLIENT_TYPES, n_deals), 0.7),
+            'Product total': (np.round(rng.lognormal(7.5, 1.0, n_deals), 2), 0.4),
+            'RW Invoice number': (rng.integers(10_000, 99_999, n_deals).astype(str), 0.3),
+        }),
+    })
+    return deals, contacts, stages
+
+def to_items(df, item_type):
+    """
+    Wraps DataFrame rows as Sell API items: [{'data': {...}, 'meta': {'type': ...}}].
+
+    Parameters:
+    - df: one of the frames returned by generate_crm.
+    - item_type: API object type, e.g. "deal".
+    """
+    return [{'data': record, 'meta': {'type': item_type}} for record in df.to_dict('records')]
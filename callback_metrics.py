@@ -0,0 +1,104 @@
+import os
+import time
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+CALLBACK_METRICS_WINDOW = int(os.getenv("CALLBACK_METRICS_WINDOW", 1000))
+PERCENTILES = [50, 95, 99]
+
+class CallbackMetrics:
+    """
+    Rolling per-callback timings. Each callback run is one sample holding its
+    wall time, the self time of every named phase inside it (a phase nested in
+    another is not counted twice) and the size of the response it produced.
+    Only the last `window` samples per callback are kept. Samples live in the
+    process, so under gunicorn each worker reports its own.
+    """
+
+    def __init__(self, window=CALLBACK_METRICS_WINDOW):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, name):
+        sample = {'phases': defaultdict(float), 'payload_bytes': None, 'cache_hit': False}
+        self._local.sample, self._local.stack = sample, []
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            self._local.sample = None
+        # Runs that raised, including PreventUpdate for hidden tabs, are not samples
+        sample['wall'] = time.perf_counter() - start
+        self._local.last = sample
+        with self._lock:
+            self._samples[name].append(sample)
+
+    @contextmanager
+    def phase(self, name):
+        # Outside a tracked callback (e.g. cache warming) phases are not recorded
+        sample = getattr(self._local, 'sample', None)
+        if sample is None:
+            yield
+            return
+        stack = self._local.stack
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            sample['phases'][name] += elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+
+    def annotate(self, **fields):
+        sample = getattr(self._local, 'sample', None)
+        if sample is not None:
+            sample.update(fields)
+
+    def record_payload(self, size):
+        # Attaches the serialized response size to the callback that just ran on this thread
+        sample = getattr(self._local, 'last', None)
+        if sample is not None:
+            sample['payload_bytes'] = size
+            self._local.last = None
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self, phases=()):
+        """
+        Returns p50/p95/p99/max per callback for wall time, each phase and the
+        response size, plus how many samples were annotated as cache hits.
+
+        Parameters:
+        - phases: phase names to always report, even when a callback never entered them.
+        """
+        # numpy is only needed here; importing it lazily keeps it off the server's startup path
+        import numpy as np
+
+        with self._lock:
+            samples = {name: list(values) for name, values in self._samples.items()}
+
+        def percentiles(values, scale=1.0):
+            if not values:
+                return None
+            points = np.percentile(np.asarray(values, dtype=float) * scale, PERCENTILES + [100])
+            return {f"p{p}" if p < 100 else "max": round(float(v), 3) for p, v in zip(PERCENTILES + [100], points)}
+
+        report = {'pid': os.getpid(), 'window': self.window, 'callbacks': {}}
+        for name, runs in sorted(samples.items()):
+            names = list(phases) + sorted({p for run in runs for p in run['phases']} - set(phases))
+            report['callbacks'][name] = {
+                'count': len(runs),
+                'cache_hits': sum(1 for run in runs if run['cache_hit']),
+                'wall_ms': percentiles([run['wall'] for run in runs], 1000),
+                **{f"{p}_ms": percentiles([run['phases'].get(p, 0.0) for run in runs], 1000) for p in names},
+                'payload_bytes': percentiles([run['payload_bytes'] for run in runs if run['payload_bytes'] is not None]),
+            }
+        return report
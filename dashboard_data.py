@@ -0,0 +1,235 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+from figure_cache import ALL_DATES
+from data_store import load_table, load_shared_table, data_signature, compact_frame
+from queries import QueryEngine, QUERY_DIMENSIONS
+from aggregates import BAND_ORDER, CUBE_MEASURES, cube_groups, cube_totals, cube_frame, segment_table, band_table, SegmentIndex
+
+logger = logging.getLogger(__name__)
+
+# Only the deal-level columns the aggregate cube and the drill-down queries need are read from disk
+DEALS_COLUMNS = ['client_segment', 'deal_band', 'converted', 'decimal_value', 'lead_time', 'added_at'] + \
+    [column for column in QUERY_DIMENSIONS if column not in ('client_segment', 'deal_band')]
+SOURCE_TABLES = ['deals_clean']
+
+DATA_REFRESH_SECONDS = float(os.getenv("DATA_REFRESH_SECONDS", 60))
+WINDOW_CACHE_SIZE = int(os.getenv("WINDOW_CACHE_SIZE", 32))
+
+class SegmentTables:
+    """
+    The tables the callbacks read, rolled up from one segment cube, with a
+    SegmentIndex per table so a segment selection is a positional slice.
+
+    Parameters:
+    - cube: DataFrame returned by build_segment_cube or cube_frame.
+    - version: data signature of the snapshot the cube comes from.
+    """
+
+    def __init__(self, cube, version):
+        self.version = version
+        self.segment_cube = cube
+        self.grouped_segments_df = segment_table(cube)
+        self.conv_rate_revenue_band = band_table(cube)
+        self.segment_indexes = {
+            name: SegmentIndex(getattr(self, name))
+            for name in ('segment_cube', 'grouped_segments_df', 'conv_rate_revenue_band')
+        }
+
+    def select(self, table, segments):
+        """
+        Returns the rows of one of the tables that belong to the given segments.
+
+        Parameters:
+        - table: attribute name, e.g. 'conv_rate_revenue_band'.
+        - segments: client segment names ('ALL' should already be expanded).
+        """
+        return self.segment_indexes[table].select(segments)
+
+    def query(self, by, filters=None):
+        """
+        Runs an aggregation query over the deals of this snapshot or window (see QueryEngine).
+
+        Parameters:
+        - by: list of columns to group by, e.g. ['client_type'].
+        - filters: optional {column: value or list of values}.
+        """
+        return self.queries.query(by, filters, self.window)
+
+class DataWindow(SegmentTables):
+    """
+    The callback tables for the deals added in one date window of a snapshot.
+    The segment list stays the snapshot's, so the dropdown and 'ALL' do not
+    change with the window.
+    """
+
+    def __init__(self, data, cube, window):
+        super().__init__(cube, data.version)
+        self.client_segments = data.client_segments
+        self.queries = data.queries
+        self.window = window
+
+class DashboardData(SegmentTables):
+    """
+    Snapshot of every table the callbacks read. A snapshot is never modified
+    after it is built; a refresh builds a new one and swaps the reference.
+
+    Parameters:
+    - deals: cleaned deals restricted to DEALS_COLUMNS, compacted (see compact_frame).
+    - version: data signature of the files the snapshot was built from.
+    """
+
+    def __init__(self, deals, version):
+        # Sorted by added_at, a date window is a binary-searched slice of rows. Deals from
+        # compact_deals already are, and a memory-mapped frame must not be copied by a sort
+        if not deals['added_at'].is_monotonic_increasing:
+            deals = deals.sort_values('added_at', kind='stable', ignore_index=True)
+        self.deals_clean_df = deals
+        self.added_at = deals['added_at'].to_numpy()
+
+        # Drill-downs are queries over the same deals, cached for the life of the snapshot
+        self.queries = QueryEngine(deals)
+        self.client_type_df = self.queries.named('client_type_df')
+
+        # Group code of every deal: the cube and every date window are bincounts over these
+        self.deal_groups, self.cube_segments = cube_groups(deals)
+        self.n_groups = len(self.cube_segments) * (len(BAND_ORDER) + 1)
+
+        # Callbacks are served from the cube and its roll-ups, never from deals_clean_df
+        super().__init__(cube_frame(cube_totals(deals, self.deal_groups, self.n_groups), self.cube_segments), version)
+        self.client_segments = sorted(self.grouped_segments_df['client_segment'].unique().tolist())
+        self.window = ALL_DATES
+
+        # Per-month totals of the cube measures: the whole months of a window are summed from
+        # these, only the deals of its partial edge months are summed again
+        deal_months = self.added_at.astype('datetime64[M]')
+        self.months = np.unique(deal_months).astype(self.added_at.dtype)
+        month_codes = np.searchsorted(self.months, deal_months.astype(self.added_at.dtype))
+        monthly = cube_totals(deals, month_codes * self.n_groups + self.deal_groups, len(self.months) * self.n_groups)
+        self.monthly_totals = monthly.reshape(len(self.months), self.n_groups, len(CUBE_MEASURES))
+        self.first_date = self.added_at[0] if len(deals) else None
+        self.last_date = self.added_at[-1] if len(deals) else None
+
+        # Per-segment row positions, rebuilt with every snapshot so a reload never serves stale rows
+        self.segment_indexes['deals_clean_df'] = SegmentIndex(deals)
+        self._windows = OrderedDict()
+        self._windows_lock = threading.Lock()
+
+    def rows_totals(self, lo, hi):
+        # Cube measures of the deals in rows [lo, hi), per group
+        return cube_totals(self.deals_clean_df.iloc[lo:hi], self.deal_groups[lo:hi], self.n_groups)
+
+    def window_cube(self, start, end):
+        """
+        Builds the segment cube of the deals added in [start, end): the whole
+        months are summed from the monthly totals, the rows of the partial months
+        at either edge are found by binary search and summed.
+
+        Parameters:
+        - start: numpy datetime64, first instant of the window.
+        - end: numpy datetime64, first instant after the window.
+        """
+        first_month = start.astype('datetime64[M]')
+        if first_month < start:
+            first_month = first_month + 1
+        first_month, last_month = (month.astype(self.added_at.dtype) for month in (first_month, end.astype('datetime64[M]')))
+        lo, hi = np.searchsorted(self.added_at, [start, end])
+        if first_month >= last_month:
+            return cube_frame(self.rows_totals(lo, hi), self.cube_segments)
+
+        inner_lo, inner_hi = np.searchsorted(self.added_at, [first_month, last_month])
+        month_lo, month_hi = np.searchsorted(self.months, [first_month, last_month])
+        totals = self.monthly_totals[month_lo:month_hi].sum(axis=0)
+        totals = totals + self.rows_totals(lo, inner_lo) + self.rows_totals(inner_hi, hi)
+        return cube_frame(totals, self.cube_segments)
+
+    def for_window(self, window):
+        """
+        Returns the tables for the deals added within a date window: the snapshot
+        itself for the whole range, otherwise a DataWindow (the last WINDOW_CACHE_SIZE are kept).
+
+        Parameters:
+        - window: (start, end) pair returned by window_key; either end may be None.
+        """
+        if window == ALL_DATES or self.first_date is None:
+            return self
+        with self._windows_lock:
+            if window in self._windows:
+                self._windows.move_to_end(window)
+                return self._windows[window]
+
+        start_date, end_date = window
+        start = np.datetime64(start_date, 'D').astype(self.added_at.dtype) if start_date else self.first_date
+        end = (np.datetime64(end_date, 'D') + 1).astype(self.added_at.dtype) if end_date else self.last_date + 1
+        view = DataWindow(self, self.window_cube(start, max(start, end)), window)
+
+        with self._windows_lock:
+            self._windows[window] = view
+            while len(self._windows) > WINDOW_CACHE_SIZE:
+                self._windows.popitem(last=False)
+        return view
+
+def compact_deals(deals):
+    # The frame DashboardData holds: compacted and sorted by added_at, before any shared copy is written
+    return compact_frame(deals).sort_values('added_at', kind='stable', ignore_index=True)
+
+def load_dashboard_data(shared_dir=None):
+    """
+    Loads the data/ artifacts and builds a DashboardData snapshot.
+
+    Parameters:
+    - shared_dir: when set, the deal table is memory-mapped from this directory (see load_shared_table).
+    """
+    version = data_signature(SOURCE_TABLES)
+    if shared_dir:
+        deals = load_shared_table('deals_clean', shared_dir, columns=DEALS_COLUMNS, prepare=compact_deals)
+    else:
+        deals = compact_deals(load_table('deals_clean', columns=DEALS_COLUMNS))
+    return DashboardData(deals, version)
+
+class DataRefresher:
+    """
+    Holds the current DashboardData and replaces it when the data/ artifacts change.
+    A daemon thread polls the file signature; a new snapshot is fully built (and
+    passed to the on_refresh hooks, e.g. to warm caches) before it is swapped in,
+    so callbacks only ever see a complete snapshot.
+
+    Parameters:
+    - shared_dir: passed through to load_dashboard_data.
+    - interval: seconds between polls; 0 disables the background thread.
+    """
+
+    def __init__(self, shared_dir=None, interval=DATA_REFRESH_SECONDS):
+        self.shared_dir = shared_dir
+        self.interval = interval
+        self.current = load_dashboard_data(shared_dir)
+        self.on_refresh = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="data-refresher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Data refresh failed, keeping the current snapshot")
+
+    def refresh(self, force=False):
+        with self._lock:
+            if not force and data_signature(SOURCE_TABLES) == self.current.version:
+                return False
+            data = load_dashboard_data(self.shared_dir)
+            for hook in self.on_refresh:
+                hook(data)
+            self.current = data
+            logger.info("Swapped in refreshed dashboard data (%s)", data.version)
+            return True
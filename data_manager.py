@@ -1,48 +1,544 @@
 import os
+import sys
+import json
+import time
+import asyncio
+import random
+import threading
+import multiprocessing
 import requests
 import pandas as pd
 import numpy as np
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+from data_store import CATEGORY_COLUMNS, save_table, share_frame, read_shared_frame
+from queries import QueryEngine, NAMED_QUERIES
 
 load_dotenv()
 API_TOKEN = os.getenv("ZENDESK_TOKEN")
 HEADERS = {"Authorization": f"Bearer {API_TOKEN}", "Accept": "application/json"}
-
-def fetch_data(dataset):
-    all_data = []
-    url = f"https://api.getbase.com/v2/{dataset}?page=1&per_page=100"
-    while url:
+# Point at a local stand-in (see benchmarks/mock_sell.py) to exercise extraction offline
+API_BASE_URL = os.getenv("SELL_API_URL", "https://api.getbase.com/v2").rstrip("/")
+
+DATASETS = ["deals", "contacts", "stages"]
+PER_PAGE = 100
+PREFETCH_PAGES = int(os.getenv("FETCH_PREFETCH_PAGES", 4))
+
+# Processes clean_deals spreads the row-wise cleaning over; 0 or 1 cleans on one core
+CLEAN_WORKERS = int(os.getenv("CLEAN_WORKERS", 0))
+
+# Sensitive or merge-only columns removed from the cleaned deals
+DROPPED_COLUMNS = [
+    'name', 
+    'custom_fields', 
+    'custom RW Invoice number', 
+    'custom Tax ID (if tax exempt)',
+    'contact_id', 'id_x', 'id_y', 'dropbox_email'
+]
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """
+    Returns the shared keep-alive session used for every API call, sized so each
+    dataset can keep PREFETCH_PAGES requests in flight at once.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = len(DATASETS) * PREFETCH_PAGES
+            adapter = HTTPAdapter(pool_connections=len(DATASETS), pool_maxsize=pool_size)
+            _session = requests.Session()
+            _session.headers.update(HEADERS)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+class RateLimiter:
+    """
+    Shared gate that pauses new requests once the API reports the quota as used
+    up (X-RateLimit-Remaining / X-RateLimit-Reset) or answers with a 429.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def delay(self):
+        # Seconds until new requests may go out
+        with self._lock:
+            return max(self._resume_at - time.monotonic(), 0.0)
+
+    def wait(self):
+        delay = self.delay()
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def update(self, status, headers):
+        if status == 429:
+            self.pause(_header_seconds(headers, "Retry-After", 1.0))
+        elif headers.get("X-RateLimit-Remaining") == "0":
+            self.pause(_header_seconds(headers, "X-RateLimit-Reset", 1.0))
+
+def _header_seconds(headers, name, default):
+    # Delay in seconds from a header; some APIs send an epoch timestamp for the reset
+    # instead, and no header may hold requests back longer than BACKOFF_MAX_SECONDS
+    try:
+        seconds = float(headers[name])
+    except (KeyError, ValueError):
+        return default
+    now = time.time()
+    if seconds > now:
+        seconds -= now
+    return min(max(seconds, 0.0), BACKOFF_MAX_SECONDS)
+
+rate_limiter = RateLimiter()
+
+# Transient failures are retried with exponential backoff and full jitter; a
+# Retry-After header, when present, sets the delay instead.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = int(os.getenv("FETCH_MAX_RETRIES", 6))
+BACKOFF_SECONDS = float(os.getenv("FETCH_BACKOFF_SECONDS", 0.5))
+BACKOFF_MAX_SECONDS = 60.0
+REQUEST_TIMEOUT = 30
+
+def backoff_delay(attempt, headers=None):
+    if headers is not None and "Retry-After" in headers:
+        return _header_seconds(headers, "Retry-After", 0.0) + random.uniform(0, BACKOFF_SECONDS)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_SECONDS * 2 ** attempt))
+
+def _get_page(session, dataset, page, query=""):
+    url = f"{API_BASE_URL}/{dataset}?page={page}&per_page={PER_PAGE}{query}"
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.wait()
         print(f"Fetching {dataset} from: {url}")
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout) as error:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff_delay(attempt)
+            print(f"{dataset} page {page}: {type(error).__name__}, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        rate_limiter.update(response.status_code, response.headers)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
             break
-        data = response.json()
-        all_data.extend(data.get("items", []))
-        url = data.get("meta", {}).get("links", {}).get("next_page")
-    return all_data
+        delay = backoff_delay(attempt, response.headers)
+        print(f"{dataset} page {page}: HTTP {response.status_code}, retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+        if response.status_code == 429:
+            # Quota errors hold back every worker, not just this one
+            rate_limiter.pause(delay)
+        else:
+            time.sleep(delay)
+
+    # A page that still fails must fail the run, never end it early with partial data
+    response.raise_for_status()
+    return response
+
+CHECKPOINT_DIR = os.path.join('data', 'raw', 'checkpoints')
+# Older checkpoints are discarded rather than resumed, their pages too stale to mix with fresh ones
+CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", 24))
+
+# Walk order of incremental pulls, and of full pulls of the datasets they update
+NEWEST_FIRST = "&sort_by=updated_at:desc"
+
+class PageCheckpoint:
+    """
+    Persists the pages of one extraction as they arrive, so an interrupted run
+    resumes after the last good page instead of starting again from page 1.
+    Pages are appended to <dataset>.jsonl; <dataset>.json records how many of
+    those lines are complete and where the last one ends, which page comes next
+    and whether the dataset is complete. Anything past that offset (a page cut
+    off or not yet recorded when the run was killed) is ignored and truncated
+    away by the next save. A checkpoint started more than CHECKPOINT_MAX_AGE_HOURS
+    ago is discarded instead of resumed. A complete checkpoint is replayed without any request until the
+    caller clears it, once the results are safely stored.
 
-def clean_deals(deals, contacts, stages):
+    Parameters:
+    - dataset: API collection name.
+    - key: identifies the query; a checkpoint left by a run with another key is discarded.
+    - directory: where the checkpoint files are kept.
+    """
+
+    def __init__(self, dataset, key="", directory=CHECKPOINT_DIR):
+        self.directory = directory
+        self.state_path = os.path.join(directory, f"{dataset}.json")
+        self.pages_path = os.path.join(directory, f"{dataset}.jsonl")
+        self.key = key
+        self.next_page = 1
+        self.saved = 0
+        self.offset = 0
+        self.started = None
+        self.complete = False
+
+    def saved_pages(self):
+        # Yields the item lists of every saved page and moves next_page past them
+        state = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)
+        if (state is None or state['key'] != self.key or 'offset' not in state
+                or time.time() - state.get('started', 0) > CHECKPOINT_MAX_AGE_HOURS * 3600):
+            self.clear()
+            return
+        with open(self.pages_path, 'rb') as f:
+            while f.tell() < state['offset']:
+                yield json.loads(f.readline())
+        self.next_page, self.saved, self.complete = state['next_page'], state['pages'], state['complete']
+        self.offset, self.started = state['offset'], state['started']
+
+    def save(self, items, last=False):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.started is None:
+            self.started = time.time()
+        with open(self.pages_path, 'r+b' if os.path.exists(self.pages_path) else 'wb') as f:
+            f.seek(self.offset)
+            f.truncate()
+            f.write((json.dumps(items) + "\n").encode())
+            self.offset = f.tell()
+        self.next_page += 1
+        self.saved += 1
+        self.complete = last
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'key': self.key, 'next_page': self.next_page, 'pages': self.saved, 'offset': self.offset,
+                       'started': self.started, 'complete': self.complete}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def clear(self):
+        for path in (self.state_path, self.pages_path):
+            if os.path.exists(path):
+                os.remove(path)
+        self.next_page, self.saved, self.offset, self.started, self.complete = 1, 0, 0, None, False
+
+def clear_checkpoints(datasets=DATASETS):
+    for dataset in datasets:
+        PageCheckpoint(dataset).clear()
+
+def page_items(data, since=None):
+    """
+    Returns the items of one decoded API page and whether it is the last page
+    to fetch.
 
-    # Helper to flatten custom fields
-    def extract_custom_fields(row):
-        if isinstance(row, list):
-            return {item['name']: item['value'] for item in row if 'name' in item}
-        return row if isinstance(row, dict) else {}
+    Parameters:
+    - data: JSON body of the page.
+    - since: optional timestamp; items updated before it are dropped and end the walk (see iter_pages).
+    """
+    items = data.get("items", [])
+    last_page = not data.get("meta", {}).get("links", {}).get("next_page")
+    if since is not None:
+        fresh = [item for item in items if pd.Timestamp(item['data']['updated_at']) >= since]
+        last_page = last_page or len(fresh) < len(items)
+        items = fresh
+    return items, last_page
+
+def iter_pages(dataset, session=None, stats=None, since=None, resume=False, newest_first=False):
+    """
+    Yields the items of a Sell API dataset one page at a time. Page 1 is
+    requested alone; once it links a next page, up to PREFETCH_PAGES pages are
+    kept in flight ahead of the one being consumed. Failed
+    requests are retried (see _get_page); a page that keeps failing raises.
 
-    # Flatten Deals
-    custom_df = pd.DataFrame(deals['custom_fields'].apply(extract_custom_fields).tolist())
-    custom_df.columns = [f"custom {col}" if not col.startswith("custom") else col for col in custom_df.columns]
-    deals = pd.concat([deals.reset_index(drop=True), custom_df.reset_index(drop=True)], axis=1)
+    Parameters:
+    - dataset: API collection name, e.g. "deals".
+    - session: optional requests.Session, defaults to the shared session.
+    - stats: optional dict filled with pages, resumed_pages, bytes and seconds for the run.
+    - since: optional timestamp; when set, only items updated at or after it are
+      returned, walking the collection newest-first and stopping at the first older item.
+    - resume: keep a PageCheckpoint so a failed or interrupted run picks up after
+      its last good page; the caller clears it (clear_checkpoints) once the data is stored.
+    - newest_first: walk the collection newest-first (as with since) even without since.
+    """
+    session = session or get_session()
+    query = NEWEST_FIRST if since is not None or newest_first else ""
+    checkpoint = PageCheckpoint(dataset, query + (since.isoformat() if since is not None else "")) if resume else None
+    pages = resumed = total_bytes = 0
+    start = time.perf_counter()
+
+    try:
+        page = 1
+        if checkpoint is not None:
+            for items in checkpoint.saved_pages():
+                resumed += 1
+                yield items
+            page = checkpoint.next_page
+            if resumed:
+                print(f"{dataset}: resumed {resumed} saved pages" + ("" if checkpoint.complete else f", continuing at page {page}"))
+            if checkpoint.complete:
+                return
+
+        with ThreadPoolExecutor(max_workers=PREFETCH_PAGES) as pool:
+            pending = {}
+            next_to_submit = page
+            # One request until a response shows there is a next page, so a one-page
+            # dataset or delta costs a single request
+            window = 1
+            try:
+                while True:
+                    while len(pending) < window:
+                        pending[next_to_submit] = pool.submit(_get_page, session, dataset, next_to_submit, query)
+                        next_to_submit += 1
+                    response = pending.pop(page).result()
+                    pages += 1
+                    total_bytes += len(response.content)
+                    items, last_page = page_items(response.json(), since)
+                    if checkpoint is not None:
+                        checkpoint.save(items, last=last_page)
+                    yield items
+                    if last_page:
+                        break
+                    window = PREFETCH_PAGES
+                    page += 1
+            finally:
+                for future in pending.values():
+                    future.cancel()
+    finally:
+        if stats is not None:
+            stats.update(pages=pages, resumed_pages=resumed, bytes=total_bytes, seconds=time.perf_counter() - start)
+
+def fetch_data(dataset, session=None, stats=None, since=None, resume=False, newest_first=False):
+    """
+    Fetches every item of a Sell API dataset (see iter_pages for the parameters).
+    """
+    return list(chain.from_iterable(iter_pages(dataset, session, stats, since, resume, newest_first)))
+
+def iter_page_frames(dataset, session=None, stats=None, resume=False):
+    # One DataFrame of record data per API page, for clean_deals_stream
+    for items in iter_pages(dataset, session, stats, resume=resume):
+        if items:
+            yield pd.DataFrame([item['data'] for item in items])
+
+def fetch_all(datasets=DATASETS, since=None, resume=False, newest_first=()):
+    """
+    Fetches several datasets in parallel over the shared session and prints
+    pages per second and bytes downloaded for each one.
 
-    # Flatten Contacts
-    contact_customs = pd.DataFrame(contacts['custom_fields'].apply(extract_custom_fields).tolist())
-    contact_customs.columns = [f"custom (contact) {col}" for col in contact_customs.columns]
-    contacts = pd.concat([contacts.reset_index(drop=True), contact_customs.reset_index(drop=True)], axis=1)
+    Parameters:
+    - datasets: list of API collection names.
+    - since: optional dict of dataset -> timestamp passed through to fetch_data.
+    - resume: passed through to fetch_data.
+    - newest_first: datasets walked newest-first even without since (see iter_pages).
+    """
+    session = get_session()
+    since = since or {}
+    stats = {dataset: {} for dataset in datasets}
+    with ThreadPoolExecutor(max_workers=len(datasets)) as pool:
+        futures = {
+            dataset: pool.submit(fetch_data, dataset, session, stats[dataset], since.get(dataset), resume,
+                                 dataset in newest_first)
+            for dataset in datasets
+        }
+        results = {dataset: future.result() for dataset, future in futures.items()}
+
+    print_fetch_stats(stats)
+    return results
+
+def print_fetch_stats(stats):
+    # One line per dataset from the stats dicts filled by iter_pages
+    for dataset, s in stats.items():
+        rate = s['pages'] / s['seconds'] if s['seconds'] else 0
+        resumed = f", {s['resumed_pages']} resumed from checkpoint" if s.get('resumed_pages') else ""
+        print(f"{dataset}: {s['pages']} pages{resumed}, {s['bytes'] / 1e6:.2f} MB in {s['seconds']:.1f}s ({rate:.1f} pages/s)")
+
+# Incremental sync: raw API records are kept in data/raw keyed by id, with a
+# per-dataset updated_at high-water mark so later runs only pull the delta.
+RAW_DIR = os.path.join('data', 'raw')
+WATERMARK_FILE = os.path.join(RAW_DIR, 'watermarks.json')
+INCREMENTAL_DATASETS = ["deals", "contacts"]
+
+def load_raw(dataset):
+    path = os.path.join(RAW_DIR, f"{dataset}.pkl")
+    return pd.read_pickle(path) if os.path.exists(path) else None
+
+def save_raw(dataset, df):
+    os.makedirs(RAW_DIR, exist_ok=True)
+    df.to_pickle(os.path.join(RAW_DIR, f"{dataset}.pkl"))
+
+def load_watermarks():
+    if not os.path.exists(WATERMARK_FILE):
+        return {}
+    with open(WATERMARK_FILE) as f:
+        return {dataset: pd.Timestamp(value) for dataset, value in json.load(f).items()}
+
+def save_watermarks(watermarks):
+    os.makedirs(RAW_DIR, exist_ok=True)
+    with open(WATERMARK_FILE, 'w') as f:
+        json.dump({dataset: value.isoformat() for dataset, value in watermarks.items()}, f, indent=2)
+
+def upsert_raw(existing, updates):
+    """
+    Merges freshly fetched records into the raw store, the newest copy of each id winning.
 
-    # Map stage names
-    stage_map = dict(zip(stages['id'], stages['name']))
-    deals['stage_name'] = deals['stage_id'].map(stage_map)
+    Parameters:
+    - existing: stored raw DataFrame, or None on the first run.
+    - updates: DataFrame of records fetched since the last watermark, newest first.
+    """
+    if updates.empty:
+        return existing if existing is not None else updates.reset_index(drop=True)
+    # Pages shift while they are walked, so a record can come twice; the first copy is the newest
+    updates = updates.drop_duplicates(subset='id', keep='first')
+    if existing is None or existing.empty:
+        return updates.sort_values('id', kind='stable').reset_index(drop=True)
+    combined = pd.concat([existing, updates], ignore_index=True)
+    combined = combined.drop_duplicates(subset='id', keep='last')
+    return combined.sort_values('id', kind='stable').reset_index(drop=True)
+
+def sync_raw(incremental=True, resume=True, use_async=False):
+    """
+    Refreshes the raw store and returns the deals, contacts and stages DataFrames.
+    Stages are small and always re-fetched in full.
+
+    Parameters:
+    - incremental: fetch only records updated since the stored watermarks;
+      when False (or no store exists yet) the full history is pulled.
+    - resume: continue from the page checkpoints of an interrupted run (see iter_pages).
+    - use_async: fetch with the asyncio client (sell_async), which keeps no checkpoints.
+    """
+    watermarks = load_watermarks() if incremental else {}
+    stores = {dataset: load_raw(dataset) if incremental else None for dataset in DATASETS}
+    since = {
+        dataset: watermarks[dataset] for dataset in INCREMENTAL_DATASETS
+        if dataset in watermarks and stores[dataset] is not None
+    }
+
+    if use_async:
+        from sell_async import fetch_all_async
+        raw = asyncio.run(fetch_all_async(DATASETS, since=since, newest_first=INCREMENTAL_DATASETS))
+    else:
+        raw = fetch_all(DATASETS, since=since, resume=resume, newest_first=INCREMENTAL_DATASETS)
+    frames = {}
+    for dataset in DATASETS:
+        updates = pd.DataFrame([item['data'] for item in raw[dataset]])
+        if dataset in since:
+            print(f"{dataset}: {len(updates)} records changed since {since[dataset].isoformat()}")
+        if dataset in INCREMENTAL_DATASETS:
+            frames[dataset] = upsert_raw(stores[dataset] if dataset in since else None, updates)
+        else:
+            frames[dataset] = updates
+        if frames[dataset].empty:
+            continue
+        save_raw(dataset, frames[dataset])
+        if dataset in INCREMENTAL_DATASETS and 'updated_at' in updates.columns:
+            # The newest record of page 1, not of every page: pages resumed from an interrupted
+            # run are older than the ones fetched after them, and whatever changed in between
+            # must still be newer than the watermark for the next run to pick it up
+            watermarks[dataset] = pd.to_datetime(updates['updated_at'].iloc[:1], utc=True).iloc[0]
+
+    save_watermarks(watermarks)
+    # Everything fetched is stored now, the next run starts from page 1 again
+    clear_checkpoints()
+    return frames['deals'], frames['contacts'], frames['stages']
+
+def custom_field_names(custom_fields):
+    """
+    Returns every field name in a custom_fields column, in first-seen order,
+    without reading any values.
+
+    Parameters:
+    - custom_fields: Series of custom_fields values from the API.
+    """
+    names = {}
+    for fields in custom_fields.tolist():
+        if isinstance(fields, list):
+            for item in fields:
+                if 'name' in item:
+                    names[item['name']] = None
+        elif isinstance(fields, dict):
+            names.update(dict.fromkeys(fields))
+    return list(names)
+
+def flatten_custom_fields(custom_fields, names=None):
+    """
+    Flattens a custom_fields column (dicts, or lists of name/value items) into one
+    column per field name. Each value is written straight into its field's column,
+    so no mapping or record is built per row and the output is the only copy.
 
+    Parameters:
+    - custom_fields: Series of custom_fields values from the API.
+    - names: optional field names to lay out, in this order; must include every
+      name in the column. Defaults to custom_field_names(custom_fields).
+    """
+    if names is None:
+        names = custom_field_names(custom_fields)
+    n_rows = len(custom_fields)
+    columns = {name: [np.nan] * n_rows for name in names}
+    for i, fields in enumerate(custom_fields.tolist()):
+        if isinstance(fields, list):
+            # A repeated name keeps its last value, as in a dict
+            for item in fields:
+                if 'name' in item:
+                    columns[item['name']][i] = item['value']
+        elif isinstance(fields, dict):
+            for name, value in fields.items():
+                columns[name][i] = value
+    return pd.DataFrame(columns, index=pd.RangeIndex(n_rows), columns=list(names))
+
+def custom_field_value(fields, name):
+    """
+    Returns one field of a custom_fields value (dict or list of name/value items),
+    or NaN when it is absent, as flatten_custom_fields would fill it.
+
+    Parameters:
+    - fields: custom_fields value of one record.
+    - name: field name, e.g. "Client Segment".
+    """
+    if isinstance(fields, dict):
+        return fields.get(name, np.nan)
+    value = np.nan
+    if isinstance(fields, list):
+        for item in fields:
+            if item.get('name') == name:
+                value = item['value']
+    return value
+
+def custom_column(name):
+    # Deal custom fields become "custom <name>" columns unless already prefixed
+    return name if name.startswith("custom") else f"custom {name}"
+
+TERMINAL_STAGES = ['Event Complete', 'Cancelled', 'Unqualified']
+# Earliest added_at kept by the ETL; the dashboard's date filter narrows further from there
+DATA_START = os.getenv("DATA_START", "2022-01-01")
+
+def deal_custom_fields(deals, names=None):
+    # The flattened custom fields of raw deals, as the "custom ..." columns prepare_deals adds
+    custom_df = flatten_custom_fields(deals['custom_fields'], names)
+    custom_df.columns = [custom_column(col) for col in custom_df.columns]
+    return custom_df
+
+def prepare_deals(deals, stage_map, field_names=None):
+    """
+    Cleans one chunk of raw deals up to the contact merge. The added_at and stage
+    filters run first, so custom fields are only flattened for rows that are kept.
+
+    Parameters:
+    - deals: DataFrame of raw deals (a single API page or the full history).
+    - stage_map: dict of stage id -> stage name.
+    - field_names: optional custom_field_names of the chunk, when the caller already has them.
+    """
+    deals = deals.reset_index(drop=True)
+
+    # Filter Dates & Stages
+    stage_name = deals['stage_id'].map(stage_map)
+    added_at = pd.to_datetime(deals['added_at'], errors='coerce').dt.tz_convert(None)
+    keep = ((added_at >= DATA_START) & stage_name.isin(TERMINAL_STAGES)).to_numpy()
+    # Names still come from every row, so the columns match a flatten-then-filter
+    if field_names is None:
+        field_names = custom_field_names(deals['custom_fields'])
+    deals = deals[keep].reset_index(drop=True)
+
+    # Flatten Deals
+    deals = pd.concat([deals, deal_custom_fields(deals, field_names)], axis=1)
+
+    deals['stage_name'] = stage_name[keep].to_numpy()
     deals['decimal_value'] = pd.to_numeric(deals['value'], errors='coerce').fillna(0)
     
     date_cols = ['custom Event Start', 'last_activity_at', 'last_stage_change_at', 'updated_at']
@@ -50,14 +546,161 @@ def clean_deals(deals, contacts, stages):
         if col in deals.columns:
             deals[col] = pd.to_datetime(deals[col], errors='coerce')
 
-    # Filter Dates & Stages
-    deals['added_at'] = pd.to_datetime(deals['added_at'], errors='coerce').dt.tz_convert(None)
-    deals = deals[deals['added_at'] >= '2022-01-01'].copy()
-    deals = deals[deals['stage_name'].isin(['Event Complete', 'Cancelled', 'Unqualified'])].copy()
+    deals['added_at'] = added_at[keep].to_numpy()
     deals['converted'] = deals['stage_name'] == 'Event Complete'
+    return deals
+
+def prepare_contacts(contacts):
+    """
+    Reduces one chunk of raw contacts to the id and client segment used by the deal merge.
+
+    Parameters:
+    - contacts: DataFrame of raw contacts.
+    """
+    # Only the segment feeds the merge, so no other contact field is flattened
+    segments = [custom_field_value(fields, 'Client Segment') for fields in contacts['custom_fields'].tolist()]
+    contacts = contacts[['id']].reset_index(drop=True)
+    contacts['custom (contact) Client Segment'] = pd.Series(segments, index=contacts.index)
+    return contacts
+
+def _concat_chunks(chunks):
+    # Empty chunks only keep the schema around, they would blur the dtypes of the rest
+    chunks = list(chunks)
+    return pd.concat([c for c in chunks if len(c)] or chunks[:1], ignore_index=True)
+
+def clean_deals_stream(deal_chunks, contact_chunks, stages):
+    """
+    Cleans deals that arrive as an iterable of chunks, e.g. one DataFrame per API
+    page. Each chunk is filtered and flattened as it arrives, so only the kept rows
+    and the contact id/segment pairs are ever held in memory. Contacts are consumed
+    on a second thread while deals are processed.
+
+    Parameters:
+    - deal_chunks: iterable of raw deal DataFrames.
+    - contact_chunks: iterable of raw contact DataFrames.
+    - stages: DataFrame of pipeline stages (id, name).
+    """
+    stage_map = dict(zip(stages['id'], stages['name']))
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        contacts_future = pool.submit(lambda: _concat_chunks(prepare_contacts(c) for c in contact_chunks))
+        deals = _concat_chunks(prepare_deals(chunk, stage_map) for chunk in deal_chunks)
+        contacts_subset = contacts_future.result()
+    return finish_deals(deals, contacts_subset)
+
+def clean_deals(deals, contacts, stages, workers=None):
+    """
+    Cleans the full raw deal, contact and stage histories, across worker
+    processes when workers (default CLEAN_WORKERS) is above 1 and the platform
+    can fork; see clean_deals_parallel.
+    """
+    workers = CLEAN_WORKERS if workers is None else workers
+    if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+        return clean_deals_parallel(deals, contacts, stages, workers)
+    return clean_deals_stream([deals], [contacts], stages)
+
+# Raw frames for the cleaning workers, which inherit them through fork instead of unpickling copies
+_clean_inputs = {}
+
+def _chunk_bounds(n_rows, n_chunks):
+    edges = np.linspace(0, n_rows, max(1, min(n_chunks, n_rows)) + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+def _prepare_deals_chunk(start, stop):
+    # The prepared chunk plus its custom columns, from which the parent lays out every chunk alike
+    deals = _clean_inputs['deals'].iloc[start:stop]
+    field_names = custom_field_names(deals['custom_fields'])
+    deals = prepare_deals(deals, _clean_inputs['stage_map'], field_names)
+    # finish_deals drops these after the merge; contact_id is still needed for it
+    deals = deals.drop(columns=[col for col in DROPPED_COLUMNS if col != 'contact_id'], errors='ignore')
+    return share_frame(deals), [custom_column(name) for name in field_names]
+
+def _prepare_contacts_chunk(start, stop):
+    return share_frame(prepare_contacts(_clean_inputs['contacts'].iloc[start:stop]))
+
+def _read_chunks(futures):
+    # Reads every chunk that finished, so no shared memory block is left behind, then raises the first failure
+    frames, errors = [], []
+    for future in futures:
+        try:
+            result = future.result()
+            frames.append(read_shared_frame(result[0] if isinstance(result, tuple) else result))
+        except Exception as error:
+            errors.append(error)
+    if errors:
+        raise errors[0]
+    return frames
+
+def _align_missing_columns(chunks):
+    # pandas no longer ignores all-missing columns when concatenating, so a chunk
+    # without a single value for a field would turn e.g. a str or datetime column
+    # into object. Such columns take the dtype the other chunks agree on, as the
+    # column of one unsplit frame would have.
+    filled = [chunk for chunk in chunks if len(chunk)]
+    for col in filled[0].columns if len(filled) > 1 else []:
+        missing = [bool(chunk[col].isna().all()) for chunk in filled]
+        dtypes = {chunk[col].dtype for chunk, empty in zip(filled, missing) if not empty}
+        if not any(missing) or len(dtypes) != 1:
+            continue
+        dtype = dtypes.pop()
+        if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype) or dtype == object:
+            continue
+        for chunk, empty in zip(filled, missing):
+            if empty and chunk[col].dtype != dtype:
+                chunk[col] = pd.Series([None] * len(chunk), index=chunk.index, dtype=dtype)
+    return chunks
+
+def clean_deals_parallel(deals, contacts, stages, workers):
+    """
+    clean_deals with the row-wise work split across a pool of forked processes.
+    Deals and contacts are cut into one row range per worker. The workers
+    inherit the raw frames through fork, and send their prepared chunks back
+    as Arrow buffers in shared memory rather than as pickles. Each chunk is
+    then laid out with the custom columns of all chunks in first-seen order,
+    as the serial path has them. The contact merge, segment remapping and
+    deal bands then run once on the combined frame. The output is identical to the
+    serial path, provided each date column uses a single format (as the API's
+    ISO 8601 does), because pd.to_datetime infers the format per chunk.
+
+    Parameters:
+    - deals, contacts, stages: raw DataFrames, as for clean_deals.
+    - workers: number of processes.
+    """
+    global _clean_inputs
+    _clean_inputs = {'deals': deals, 'contacts': contacts, 'stage_map': dict(zip(stages['id'], stages['name']))}
+    deal_bounds = _chunk_bounds(len(deals), workers)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            contact_futures = [pool.submit(_prepare_contacts_chunk, start, stop) for start, stop in _chunk_bounds(len(contacts), workers)]
+            deal_futures = [pool.submit(_prepare_deals_chunk, start, stop) for start, stop in deal_bounds]
+            frames = _read_chunks(contact_futures + deal_futures)
+    finally:
+        _clean_inputs = {}
+
+    contacts_subset = _concat_chunks(_align_missing_columns(frames[:len(contact_futures)]))
+    deal_chunks = frames[len(contact_futures):]
+    chunk_customs = [future.result()[1] for future in deal_futures]
+
+    # Raw columns, then every custom column in first-seen order over the chunks in row
+    # order (that of the whole column), then the columns prepare_deals derives
+    customs = list(dict.fromkeys(chain.from_iterable(chunk_customs)))
+    first = deal_chunks[0].columns
+    derived = [col for col in first if col not in deals.columns and col not in chunk_customs[0]]
+    present = set(chain.from_iterable(chunk.columns for chunk in deal_chunks))
+    layout = [col for col in list(deals.columns) + customs + derived if col in present]
+    deal_chunks = [chunk.reindex(columns=layout) for chunk in deal_chunks]
+    return finish_deals(_concat_chunks(_align_missing_columns(deal_chunks)), contacts_subset)
+
+def finish_deals(deals, contacts_subset):
+    """
+    Merges prepared deals with contact segments, then normalizes segments and
+    adds lead time and deal bands.
+
+    Parameters:
+    - deals: output of prepare_deals.
+    - contacts_subset: output of prepare_contacts.
+    """
 
     # Merge with Contacts 
-    contacts_subset = contacts[['id', 'custom (contact) Client Segment']].copy()
     deals = deals.merge(contacts_subset, left_on='contact_id', right_on='id', how="left")
 
     deals['custom Client Segment'] = np.where(
@@ -94,14 +737,7 @@ def clean_deals(deals, contacts, stages):
     )
     
     # Drop sensitive columns
-    cols_to_drop = [
-        'name', 
-        'custom_fields', 
-        'custom RW Invoice number', 
-        'custom Tax ID (if tax exempt)',
-        'contact_id', 'id_x', 'id_y', 'dropbox_email'
-    ]
-    deals = deals.drop(columns=cols_to_drop, errors='ignore')
+    deals = deals.drop(columns=DROPPED_COLUMNS, errors='ignore')
 
     return deals
 
@@ -109,119 +745,61 @@ def create_grouped_segments_df(deals):
 
     """    
     Creates a grouped DataFrame summarizing key metrics by client segment.   
+    The grouped_segments_df named query (see queries.py).
 
     Parameters:
     - deals: DataFrame containing cleaned deals data.
     """ 
 
-    # Base Stats 
-    grouped = deals.groupby('client_segment')['converted'].agg(['sum', 'count']).reset_index()
-    grouped.rename(columns={'count': 'total_deals', 'sum': 'converted_deals'}, inplace=True)
-    
-    # Conversion Rate
-    grouped['conversion_rate'] = (grouped['converted_deals'] / grouped['total_deals']).round(2)
-    
-    # Overall Percentages
-    total_deals_overall = grouped['total_deals'].sum()
-    grouped['pct_total_deals'] = ((grouped['total_deals'] / total_deals_overall) * 100).round(2)
-
-    # Revenue Calculations 
-    converted_only = deals[deals['converted'] == True]
-    total_rev_overall = converted_only['decimal_value'].sum() 
-    
-    rev_stats = converted_only.groupby('client_segment')['decimal_value'].agg(['sum', 'mean']).reset_index()
-    rev_stats.rename(columns={'sum': 'segment_revenue', 'mean': 'avg_deal_size'}, inplace=True)
-    
-    # Lead Time Calculation 
-    lead_stats = deals.groupby('client_segment')['lead_time'].mean().reset_index()
-    lead_stats.rename(columns={'lead_time': 'avg_lead_time'}, inplace=True)
-
-    final_df = grouped.merge(rev_stats, on='client_segment', how='left')
-    final_df = final_df.merge(lead_stats, on='client_segment', how='left')
-
-    final_df['percent_total_revenue'] = ((final_df['segment_revenue'] / total_rev_overall) * 100).round(2)
-    final_df['segment_revenue'] = final_df['segment_revenue'].fillna(0).round()
-    final_df['avg_deal_size'] = final_df['avg_deal_size'].fillna(0).round()
-    final_df['avg_lead_time'] = final_df['avg_lead_time'].round(1)
-
-    return final_df
+    return QueryEngine(deals).named('grouped_segments_df')
 
 def create_conv_rate_revenue_band(deals):
     """                                                             
     Creates a detailed DataFrame summarizing conversion rates and revenue by client segment and deal band.  
+    The conv_rate_revenue_band named query (see queries.py).
 
     Parameters: 
 
     - deals: DataFrame containing cleaned deals data.
     """ 
 
-    # Calculate overall total revenue from converted deals
-    total_rev_overall = deals[deals['converted'] == True]['decimal_value'].sum()
+    return QueryEngine(deals).named('conv_rate_revenue_band')
 
-    # Grouping for Base Stats
-    conv_rate_band_segments = deals.groupby(['client_segment', 'deal_band'], observed=False)['converted'].agg(['sum', 'count']).reset_index()
-    conv_rate_band_segments.rename(columns={'sum': 'converted_deals', 'count': 'total_deals'}, inplace=True)
-    
-    # Calculate conversion rate
-    conv_rate_band_segments['conversion_rate'] = (conv_rate_band_segments['converted_deals'] / conv_rate_band_segments['total_deals'] * 100).fillna(0)
-
-    # Revenue per Segment and Band
-    converted_only = deals[deals['converted'] == True].copy()
-    pctrevenue_band = converted_only.groupby(['client_segment', 'deal_band'], observed=False).agg({
-        'decimal_value': 'sum'
-    }).reset_index()
-    pctrevenue_band.rename(columns={'decimal_value': 'total_revenue_segment'}, inplace=True)
-    
-    # Calculate percent of total revenue
-    pctrevenue_band['percent_total_revenue'] = (pctrevenue_band['total_revenue_segment'] / total_rev_overall * 100).round(4)
-
-    # Merge and calculate mix
-    final_df = conv_rate_band_segments.merge(pctrevenue_band, on=['client_segment', 'deal_band'], how='left')
-    final_df['total_revenue_segment'] = final_df['total_revenue_segment'].fillna(0)
-
-    # Revenue Mix within segment
-    final_df['percent_rev_within_segment'] = final_df.groupby('client_segment')['percent_total_revenue'].transform(
-        lambda x: (x / x.sum() * 100) if x.sum() > 0 else 0
-    ).round(2)
-
-    # Expected Value and Average Size
-    final_df['avg_deal_size'] = (final_df['total_revenue_segment'] / final_df['converted_deals']).replace([np.inf, -np.inf], 0).fillna(0)
-    final_df['expected_value'] = ((final_df['conversion_rate'] / 100) * final_df['avg_deal_size']).round(2)
-
-    # Missed Opportunities
-    missed_deals = deals[deals['converted'] == False]
-    missed_stats = missed_deals.groupby(['client_segment', 'deal_band'], observed=False).agg(
-        missed_revenue=('decimal_value', 'sum'),
-        missed_deal_count=('decimal_value', 'count')
-    ).reset_index()
-
-    final_df = final_df.merge(missed_stats, on=['client_segment', 'deal_band'], how='left')
-    final_df[['missed_revenue', 'missed_deal_count']] = final_df[['missed_revenue', 'missed_deal_count']].fillna(0)
-    
-    return final_df
+def create_client_type_df(deals):
+    """
+    Creates the converted/total deal counts and conversion rate per client segment and client type.
+    The client_type_df named query (see queries.py).
+
+    Parameters:
+    - deals: DataFrame containing cleaned deals data.
+    """
+
+    return QueryEngine(deals).named('client_type_df')
 
 if __name__ == "__main__":
     os.makedirs('data', exist_ok=True)
-    
-    raw_deals = fetch_data("deals")
-    raw_contacts = fetch_data("contacts")
-    raw_stages = fetch_data("stages")
-    
-    if raw_deals and raw_contacts and raw_stages:
-        df_deals = pd.DataFrame([d['data'] for d in raw_deals])
-        df_contacts = pd.DataFrame([c['data'] for c in raw_contacts])
-        df_stages = pd.DataFrame([s['data'] for s in raw_stages])
-        
-        df_master = clean_deals(df_deals, df_contacts, df_stages)
-        
-        df_segments = create_grouped_segments_df(df_master)
-        df_bands = create_conv_rate_revenue_band(df_master)
-        
-        df_master.to_csv("data/deals_clean.csv", index=False)
-        df_segments.to_csv("data/grouped_segments_df.csv", index=False)
-        df_bands.to_csv("data/conv_rate_revenue_band.csv", index=False)
-        print("Done! All files saved in /data")
-        
 
+    if "--stream" in sys.argv:
+        # Full pull cleaned page by page; memory is bounded by the kept rows, no raw store is written
+        df_stages = pd.DataFrame([s['data'] for s in fetch_data("stages", resume=True)])
+        df_master = clean_deals_stream(iter_page_frames("deals", resume=True), iter_page_frames("contacts", resume=True), df_stages)
+    else:
+        # Pass --full to ignore the stored watermarks and re-pull the whole history,
+        # --async to fetch with the asyncio client
+        df_deals, df_contacts, df_stages = sync_raw(incremental="--full" not in sys.argv, use_async="--async" in sys.argv)
+        df_master = None
+        if not (df_deals.empty or df_contacts.empty or df_stages.empty):
+            df_master = clean_deals(df_deals, df_contacts, df_stages)
+
+    if df_master is not None and not df_master.empty:
+        categories = {col: 'category' for col in CATEGORY_COLUMNS if col in df_master.columns}
+        save_table("deals_clean", df_master.astype(categories))
+
+        # grouped_segments_df, conv_rate_revenue_band and client_type_df are named queries on the cleaned deals
+        queries = QueryEngine(df_master)
+        for name in NAMED_QUERIES:
+            save_table(name, queries.named(name))
+        print("Done! All files saved in /data")
 
-    
\ No newline at end of file
+    if "--stream" in sys.argv:
+        clear_checkpoints()
@@ -0,0 +1,221 @@
+import os
+import glob
+import hashlib
+from multiprocessing import shared_memory, resource_tracker
+import pandas as pd
+import pyarrow as pa
+from aggregates import BAND_ORDER
+
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+DATETIME_COLUMNS = ['added_at', 'updated_at', 'last_stage_change_at', 'last_activity_at', 'event_start_date']
+BOOL_COLUMNS = ['converted', 'hot']
+CATEGORY_COLUMNS = ['client_segment', 'client_type', 'stage_name']
+
+def table_path(name, ext="parquet"):
+    return os.path.join(DATA_DIR, f"{name}.{ext}")
+
+def restore_dtypes(df, categorical=True):
+    """
+    Re-applies the dtypes clean_deals produces to a frame that went through CSV:
+    datetimes, booleans, string categoricals and the ordered deal_band.
+
+    Parameters:
+    - df: DataFrame read back from one of the data/ CSV files.
+    - categorical: also store the client_segment/client_type/stage_name strings as categoricals.
+    """
+    df = df.copy()
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce', format='ISO8601')
+    for col in BOOL_COLUMNS:
+        if col in df.columns and df[col].notna().all():
+            df[col] = df[col].astype(bool)
+    if 'deal_band' in df.columns:
+        df['deal_band'] = pd.Categorical(df['deal_band'], categories=BAND_ORDER, ordered=True)
+    if categorical:
+        for col in CATEGORY_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+    return df
+
+def _lossless_float32(values):
+    narrow = values.astype('float32')
+    same = (narrow.astype('float64') == values) | (values.isna() & narrow.isna())
+    return narrow if same.all() else values
+
+def compact_frame(df):
+    """
+    Shrinks a frame for holding in memory without changing any value: segment
+    and band strings become categoricals (integer codes), integers are downcast
+    to the smallest type that fits and floats to float32 where every value
+    survives the round trip.
+
+    Parameters:
+    - df: DataFrame, e.g. the deal columns the dashboard loads.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col == 'deal_band':
+            df[col] = pd.Categorical(df[col], categories=BAND_ORDER, ordered=True)
+        elif col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype('category')
+        elif pd.api.types.is_integer_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = _lossless_float32(df[col])
+    return df
+
+def _arrow_safe(df):
+    # Custom fields can mix ints, strings and lists in one column; Arrow needs one type per column
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[col], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[col] = df[col].map(lambda v: v if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+    return df
+
+def save_table(name, df):
+    """
+    Writes a table as typed Parquet plus a CSV copy for inspection.
+
+    Parameters:
+    - name: artifact name, e.g. "deals_clean".
+    - df: DataFrame to store.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    # Write then rename, so a running dashboard polling data/ never reads a half-written file
+    for ext, write in (("csv", df.to_csv), ("parquet", _arrow_safe(df).to_parquet)):
+        tmp_path = f"{table_path(name, ext)}.tmp"
+        write(tmp_path, index=False)
+        os.replace(tmp_path, table_path(name, ext))
+
+def load_table(name, columns=None):
+    """
+    Loads a table from Parquet, reading only the requested columns.
+    Falls back to the CSV copy (with dtypes restored) when no Parquet file exists.
+
+    Parameters:
+    - name: artifact name, e.g. "deals_clean".
+    - columns: optional list of columns to load.
+    """
+    if os.path.exists(table_path(name)):
+        return pd.read_parquet(table_path(name), columns=columns)
+    # Aggregate tables keep client_segment as plain strings, they are only a few rows
+    df = pd.read_csv(table_path(name, "csv"), usecols=columns)
+    return restore_dtypes(df, categorical=name == "deals_clean")
+
+def data_signature(names):
+    """
+    Returns a version string for the given tables built from file sizes and
+    modification times, so anything derived from them can tell when they change.
+
+    Parameters:
+    - names: artifact names, e.g. ["deals_clean", "client_type_df"].
+    """
+    parts = []
+    for name in names:
+        for ext in ("parquet", "csv"):
+            if os.path.exists(table_path(name, ext)):
+                stat = os.stat(table_path(name, ext))
+                parts.append(f"{name}.{ext}:{stat.st_size}:{stat.st_mtime_ns}")
+                break
+    return "|".join(parts)
+
+def load_shared_table(name, shared_dir, columns=None, prepare=None):
+    """
+    Loads a table through an uncompressed Arrow IPC file in shared_dir (e.g. under
+    /dev/shm) and memory-maps it, so every worker process on the host reads the
+    same pages instead of holding its own copy. The first worker to arrive writes
+    the file under a lock; the file name changes whenever the source data does.
+
+    Parameters:
+    - name: artifact name, e.g. "deals_clean".
+    - shared_dir: directory visible to all workers on the host.
+    - columns: optional list of columns to load.
+    - prepare: optional function applied to the frame before it is shared, e.g. compact_frame.
+    """
+    # POSIX only, like shared mode itself; importing it at the top would break the module on Windows
+    import fcntl
+    os.makedirs(shared_dir, exist_ok=True)
+    key = hashlib.sha1(f"{data_signature([name])}|{columns}|{getattr(prepare, '__name__', None)}".encode()).hexdigest()[:12]
+    path = os.path.join(shared_dir, f"{name}-{key}.arrow")
+
+    if not os.path.exists(path):
+        with open(os.path.join(shared_dir, f"{name}.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(path):
+                df = load_table(name, columns)
+                if prepare is not None:
+                    df = prepare(df)
+                table = pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+                os.replace(tmp_path, path)
+                # Workers still mapping an older version keep their pages until they reload
+                for stale in glob.glob(os.path.join(shared_dir, f"{name}-*.arrow")):
+                    if stale != path:
+                        os.remove(stale)
+
+    # The map stays open for as long as the returned frame references its buffers
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    return table.to_pandas(split_blocks=True)
+
+def _write_stream(table, sink):
+    # Kept apart so no view of a shared block outlives the write, the block can't be closed while one exists
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+def share_frame(df):
+    """
+    Writes a frame to a new shared memory block as an Arrow IPC stream, so it
+    can be handed to another process without pickling its columns. Object
+    columns (e.g. lists of tags), which Arrow cannot round-trip exactly, travel
+    in the returned handle instead. The index is not kept. Returns the handle
+    for read_shared_frame, which frees the block.
+
+    Parameters:
+    - df: DataFrame to share.
+    """
+    arrow_columns = [col for col in df.columns if df[col].dtype != object]
+    table = pa.Table.from_pandas(df[arrow_columns], preserve_index=False)
+    sizer = pa.MockOutputStream()
+    _write_stream(table, sizer)
+    size = sizer.size()
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        _write_stream(table, pa.FixedSizeBufferWriter(pa.py_buffer(block.buf)))
+    except BaseException:
+        block.close()
+        block.unlink()
+        raise
+    block.close()
+    # The reader frees the block; this process's tracker would otherwise unlink it (or warn) at exit.
+    # Only POSIX blocks are tracked, under their name with the leading "/" that .name leaves out
+    if os.name == "posix":
+        resource_tracker.unregister("/" + block.name, 'shared_memory')
+    objects = df[[col for col in df.columns if col not in arrow_columns]]
+    return {'name': block.name, 'size': size, 'columns': list(df.columns), 'objects': objects}
+
+def read_shared_frame(handle):
+    """
+    Returns the frame written by share_frame and frees its shared memory block.
+
+    Parameters:
+    - handle: value returned by share_frame.
+    """
+    block = shared_memory.SharedMemory(handle['name'])
+    try:
+        # Copied out in one piece, the frame must not keep views of a block about to be freed
+        data = pa.py_buffer(bytes(block.buf[:handle['size']]))
+    finally:
+        block.close()
+        block.unlink()
+    table = pa.ipc.open_stream(data).read_all()
+    df = table.to_pandas() if table.num_columns else pd.DataFrame(index=pd.RangeIndex(len(handle['objects'])))
+    for col in handle['objects'].columns:
+        df[col] = handle['objects'][col].to_numpy()
+    return df[handle['columns']]
@@ -0,0 +1,206 @@
+import os
+import gzip
+import json
+import hashlib
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from flask import Response
+from plotly.io.json import to_json_plotly
+
+FIGURE_CACHE_SIZE = int(os.getenv("FIGURE_CACHE_SIZE", 256))
+
+def to_payload(outputs):
+    # Figures and Dash components become plain JSON types, cheap to re-send and safe to share
+    return json.loads(to_json_plotly(outputs))
+
+def segment_key(selected_segments, all_segments):
+    """
+    Normalizes a dropdown selection so equivalent selections share one cache entry.
+
+    Parameters:
+    - selected_segments: dropdown value, may contain 'ALL'.
+    - all_segments: every client segment, used to expand 'ALL'.
+    """
+    if not selected_segments:
+        return ()
+    if 'ALL' in selected_segments:
+        selected_segments = all_segments
+    return tuple(sorted(set(selected_segments)))
+
+# Date window of the whole snapshot, as sent by an empty date picker
+ALL_DATES = (None, None)
+
+def window_key(start_date, end_date):
+    """
+    Normalizes the date picker values to a (start, end) pair of 'YYYY-MM-DD'
+    strings or None, used in cache keys and render tokens.
+
+    Parameters:
+    - start_date: first day of the window (inclusive), date or datetime string, or None.
+    - end_date: last day of the window (inclusive), date or datetime string, or None.
+    """
+    return tuple(str(value)[:10] if value else None for value in (start_date, end_date))
+
+class FigureCache:
+    """
+    Bounded LRU of serialized callback outputs. Entries belong to one data
+    version; moving to a new version drops everything cached for the old one.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE, version=None):
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            version = self.version
+
+        payload = to_payload(compute())
+
+        with self._lock:
+            if version == self.version:
+                self._entries[key] = payload
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return payload
+
+    def set_version(self, version):
+        with self._lock:
+            if version != self.version:
+                self.version = version
+                self._entries.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'version': self.version,
+            }
+
+class SharedFigureCache:
+    """
+    FigureCache backed by a SQLite file, so every worker process on the host
+    reads and warms the same entries. Hit/miss counters are shared as well.
+    """
+
+    def __init__(self, path, maxsize=FIGURE_CACHE_SIZE, version=None):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, version TEXT, payload TEXT, used REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0)")
+        # Nothing is pruned here: a worker starting (or respawned) must not wipe what the others warmed
+        self.version = version
+
+    def _connect(self):
+        # One connection per thread and per process; connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_or_compute(self, key, compute):
+        conn = self._connect()
+        key = repr(key)
+        row = conn.execute("SELECT payload FROM entries WHERE key = ? AND version = ?", (key, self.version)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+            conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'hits'")
+            return json.loads(row[0])
+
+        conn.execute("UPDATE counters SET value = value + 1 WHERE name = 'misses'")
+        payload = to_payload(compute())
+        conn.execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+            (key, self.version, json.dumps(payload), time.time())
+        )
+        conn.execute(
+            "DELETE FROM entries WHERE key NOT IN (SELECT key FROM entries ORDER BY used DESC LIMIT ?)",
+            (self.maxsize,)
+        )
+        return payload
+
+    def set_version(self, version):
+        # Entries of other data versions are pruned once this worker has a real one
+        self.version = version
+        if version is not None:
+            self._connect().execute("DELETE FROM entries WHERE version IS NOT ?", (version,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM entries")
+
+    def stats(self):
+        conn = self._connect()
+        counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else None,
+            'size': conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            'maxsize': self.maxsize,
+            'version': self.version,
+            'shared': True,
+        }
+
+class CompressedPayload:
+    """
+    A response body serialized and gzip-compressed once, served many times.
+    Responses carry an ETag from the content (one per encoding) and must be
+    revalidated, so a browser that already holds this version gets an empty
+    304 instead of the body.
+
+    Parameters:
+    - value: JSON-serializable value, e.g. a Dash layout.
+    """
+
+    def __init__(self, value):
+        self.body = to_json_plotly(value).encode()
+        self.gzipped = gzip.compress(self.body, compresslevel=9)
+        self.etag = hashlib.sha1(self.body).hexdigest()[:20]
+
+    def response(self, request):
+        """
+        Returns the response to a GET: 304 when If-None-Match holds the current
+        ETag, otherwise the gzipped body if the client accepts gzip, else the plain one.
+
+        Parameters:
+        - request: the current flask request.
+        """
+        gzipped = 'gzip' in request.accept_encodings
+        response = Response(self.gzipped if gzipped else self.body, mimetype='application/json')
+        if gzipped:
+            response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        response.set_etag(f"{self.etag}-gzip" if gzipped else self.etag)
+        return response.make_conditional(request)
+
+    def stats(self):
+        return {'etag': self.etag, 'bytes': len(self.body), 'gzip_bytes': len(self.gzipped)}
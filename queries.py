@@ -0,0 +1,188 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from aggregates import CUBE_MEASURES, cube_totals, segment_table, band_table
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 128))
+
+# Deal columns the dashboard loads for grouping and filtering queries
+QUERY_DIMENSIONS = ['client_segment', 'deal_band', 'client_type', 'stage_name', 'owner_id', 'source_id']
+
+def aggregate(deals, by, filters=None):
+    """
+    Sums the cube measures of the deals matching filters per combination of the
+    by columns, in one pass: every row gets a single group code and each measure
+    is a weighted bincount over those codes, as for the segment cube. Missing
+    values form their own group. Only combinations holding at least one deal
+    are returned, sorted by the by columns, with the ratios from add_rates.
+
+    Parameters:
+    - deals: cleaned deals with the by and filter columns plus converted, decimal_value and lead_time.
+    - by: list of columns to group by; empty for a single overall row.
+    - filters: optional {column: value or list of values} the deals must match.
+    """
+    if filters:
+        mask = np.ones(len(deals), dtype=bool)
+        for column, values in filters.items():
+            values = list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]
+            mask &= deals[column].isin(values).to_numpy()
+        deals = deals[mask]
+
+    group = np.zeros(len(deals), dtype=np.intp)
+    levels = []
+    for column in by:
+        codes, uniques = pd.factorize(deals[column], sort=True, use_na_sentinel=False)
+        group = group * len(uniques) + codes
+        levels.append(uniques)
+    n_groups = int(np.prod([len(uniques) for uniques in levels])) if len(deals) else 0
+
+    totals = cube_totals(deals, group, n_groups)
+    group_ids = np.flatnonzero(totals[:, 0] > 0)
+
+    # Group codes are mixed radix, the last by column varying fastest
+    columns = {}
+    remaining = group_ids
+    for column, uniques in reversed(list(zip(by, levels))):
+        columns[column] = uniques.take(remaining % len(uniques))
+        remaining = remaining // len(uniques)
+
+    result = pd.DataFrame({column: columns[column] for column in by}, index=pd.RangeIndex(len(group_ids)))
+    for i, name in enumerate(CUBE_MEASURES):
+        values = totals[group_ids, i]
+        result[name] = values.astype('int64') if name.endswith(('deals', 'count')) else values
+    return add_rates(result)
+
+def add_rates(result):
+    """
+    Adds the ratio measures to a frame of summed cube measures: conversion_rate
+    (%), avg_deal_size and expected_value (per lead) over converted deals, and
+    avg_lead_time in days.
+
+    Parameters:
+    - result: DataFrame with the CUBE_MEASURES columns.
+    """
+    has_revenue = result['converted_deals'] > 0
+    result['conversion_rate'] = result['converted_deals'] / result['total_deals'] * 100
+    result['avg_deal_size'] = (result['converted_revenue'] / result['converted_deals'].where(has_revenue)).fillna(0)
+    result['expected_value'] = result['conversion_rate'] / 100 * result['avg_deal_size']
+    result['avg_lead_time'] = result['lead_time_sum'] / result['lead_time_count'].replace(0, np.nan)
+    return result
+
+def client_type_table(result):
+    """
+    Formats a client_segment x client_type query as the client_type_df table.
+
+    Parameters:
+    - result: DataFrame returned by aggregate.
+    """
+    table = result.dropna(subset=['client_segment', 'client_type'])
+    table = table[['client_segment', 'client_type', 'converted_deals', 'total_deals']].rename(
+        columns={'converted_deals': 'sum', 'total_deals': 'count'}).reset_index(drop=True)
+    table['conversion_rate'] = (table['sum'] / table['count'] * 100).round(2)
+    return table
+
+# Each table the ETL saves is one query plus the function formatting its result
+NAMED_QUERIES = {
+    'grouped_segments_df': (['client_segment', 'deal_band'], segment_table),
+    'conv_rate_revenue_band': (['client_segment', 'deal_band'], band_table),
+    'client_type_df': (['client_segment', 'client_type'], client_type_table),
+}
+
+def _filters_key(filters):
+    # Filters as a hashable, order-independent key
+    key = []
+    for column, values in sorted((filters or {}).items()):
+        values = values if isinstance(values, (list, tuple, set, frozenset)) else [values]
+        key.append((column, tuple(sorted(values, key=str))))
+    return tuple(key)
+
+class QueryEngine:
+    """
+    Aggregation queries over one set of cleaned deals, each result kept in a
+    bounded LRU keyed by the query. When the deals are sorted by added_at (as in
+    a DashboardData snapshot) a date window is a binary-searched slice.
+    Results are shared between callers and must not be modified.
+
+    Parameters:
+    - deals: cleaned deals (see aggregate for the columns a query needs).
+    - maxsize: number of query results kept.
+    """
+
+    def __init__(self, deals, maxsize=QUERY_CACHE_SIZE):
+        self.deals = deals
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._added_at = deals['added_at'].to_numpy() if 'added_at' in deals.columns else None
+        self._sorted = self._added_at is not None and bool(np.all(self._added_at[1:] >= self._added_at[:-1]))
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _window_deals(self, window):
+        # window is a (start, end) pair of inclusive 'YYYY-MM-DD' days, either may be None
+        start_date, end_date = window
+        start = np.datetime64(start_date, 'D') if start_date else None
+        end = np.datetime64(end_date, 'D') + 1 if end_date else None
+        if self._sorted:
+            lo = np.searchsorted(self._added_at, start.astype(self._added_at.dtype)) if start is not None else 0
+            hi = np.searchsorted(self._added_at, end.astype(self._added_at.dtype)) if end is not None else len(self._added_at)
+            return self.deals.iloc[lo:max(lo, hi)]
+        mask = np.ones(len(self.deals), dtype=bool)
+        if start is not None:
+            mask &= self._added_at >= start
+        if end is not None:
+            mask &= self._added_at < end
+        return self.deals[mask]
+
+    def _cached(self, key, compute):
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return self._results[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return result
+
+    def query(self, by=(), filters=None, window=None):
+        """
+        Returns the measures of aggregate for the deals matching filters and added
+        within window, grouped by the by columns.
+
+        Parameters:
+        - by: list of columns to group by.
+        - filters: optional {column: value or list of values}.
+        - window: optional (start, end) pair of inclusive 'YYYY-MM-DD' days, either may be None.
+        """
+        window = tuple(window) if window and any(window) else None
+        key = ('query', tuple(by), _filters_key(filters), window)
+
+        def compute():
+            deals = self._window_deals(window) if window else self.deals
+            return aggregate(deals, list(by), filters)
+
+        return self._cached(key, compute)
+
+    def named(self, name, filters=None, window=None):
+        """
+        Returns one of the NAMED_QUERIES tables, e.g. 'client_type_df'.
+
+        Parameters:
+        - name: key of NAMED_QUERIES.
+        - filters: optional {column: value or list of values}.
+        - window: optional (start, end) pair of inclusive 'YYYY-MM-DD' days.
+        """
+        by, finish = NAMED_QUERIES[name]
+        window = tuple(window) if window and any(window) else None
+        key = ('named', name, _filters_key(filters), window)
+        return self._cached(key, lambda: finish(self.query(by, filters, window)))
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._results), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,171 @@
+import json
+import time
+import asyncio
+import aiohttp
+import data_manager as dm
+
+class AsyncSellClient:
+    """
+    asyncio counterpart of data_manager.fetch_data / fetch_all, for pulling the
+    CRM from inside a process that already runs an event loop. Returns the same
+    item lists, with the same retries, backoff and shared rate limit; requests
+    for each dataset are bounded by that dataset's semaphore, every request has
+    a timeout, and cancelling a fetch cancels its requests in flight. Pages are
+    not checkpointed: an interrupted run starts again from page 1.
+
+    Use as `async with AsyncSellClient() as client: ...`.
+
+    Parameters:
+    - concurrency: requests in flight per dataset.
+    - timeout: seconds allowed for each request, connecting through reading the body.
+    """
+
+    def __init__(self, concurrency=dm.PREFETCH_PAGES, timeout=dm.REQUEST_TIMEOUT):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = None
+        self._semaphores = {}
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(limit=len(dm.DATASETS) * self.concurrency)
+        self.session = aiohttp.ClientSession(headers=dm.HEADERS, connector=connector,
+                                             timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.session.close()
+        self.session = None
+
+    def semaphore(self, dataset):
+        # Shared by every fetch of the dataset through this client
+        if dataset not in self._semaphores:
+            self._semaphores[dataset] = asyncio.BoundedSemaphore(self.concurrency)
+        return self._semaphores[dataset]
+
+    async def get_page(self, dataset, page, query=""):
+        """
+        Returns the decoded JSON body and byte size of one API page, retried
+        like data_manager._get_page. The semaphore is released while backing off.
+
+        Parameters:
+        - dataset: API collection name.
+        - page: page number, from 1.
+        - query: extra query string, e.g. the updated_at sort of an incremental pull.
+        """
+        url = f"{dm.API_BASE_URL}/{dataset}?page={page}&per_page={dm.PER_PAGE}{query}"
+        for attempt in range(dm.MAX_RETRIES + 1):
+            await asyncio.sleep(dm.rate_limiter.delay())
+            error = None
+            async with self.semaphore(dataset):
+                print(f"Fetching {dataset} from: {url}")
+                try:
+                    async with self.session.get(url) as response:
+                        body = await response.read()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as caught:
+                    if attempt == dm.MAX_RETRIES:
+                        raise
+                    error = caught
+            if error is not None:
+                delay = dm.backoff_delay(attempt)
+                print(f"{dataset} page {page}: {type(error).__name__}, retry {attempt + 1}/{dm.MAX_RETRIES} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            dm.rate_limiter.update(response.status, response.headers)
+            if response.status not in dm.RETRY_STATUSES or attempt == dm.MAX_RETRIES:
+                break
+            delay = dm.backoff_delay(attempt, response.headers)
+            print(f"{dataset} page {page}: HTTP {response.status}, retry {attempt + 1}/{dm.MAX_RETRIES} in {delay:.1f}s")
+            if response.status == 429:
+                # Quota errors hold back every request, sync or async
+                dm.rate_limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+
+        # A page that still fails must fail the run, never end it early with partial data
+        response.raise_for_status()
+        return json.loads(body), len(body)
+
+    async def iter_pages(self, dataset, stats=None, since=None, newest_first=False):
+        """
+        Yields the items of a dataset one page at a time, in page order. Page 1
+        is requested alone; once it links a next page, up to concurrency pages
+        are requested ahead (see data_manager.iter_pages for the parameters).
+        Pages requested past the last one are cancelled.
+        """
+        query = dm.NEWEST_FIRST if since is not None or newest_first else ""
+        pages = total_bytes = 0
+        start = time.perf_counter()
+        pending = {}
+        next_to_request = page = 1
+        window = 1
+        try:
+            while True:
+                while len(pending) < window:
+                    pending[next_to_request] = asyncio.ensure_future(self.get_page(dataset, next_to_request, query))
+                    next_to_request += 1
+                data, size = await pending.pop(page)
+                pages += 1
+                total_bytes += size
+                items, last_page = dm.page_items(data, since)
+                yield items
+                if last_page:
+                    break
+                window = self.concurrency
+                page += 1
+        finally:
+            for task in pending.values():
+                task.cancel()
+            await asyncio.gather(*pending.values(), return_exceptions=True)
+            if stats is not None:
+                stats.update(pages=pages, resumed_pages=0, bytes=total_bytes, seconds=time.perf_counter() - start)
+
+    async def fetch_data(self, dataset, stats=None, since=None, newest_first=False):
+        """
+        Fetches every item of a dataset, as data_manager.fetch_data does.
+
+        Parameters:
+        - dataset: API collection name, e.g. "deals".
+        - stats: optional dict filled with pages, bytes and seconds for the run.
+        - since: optional timestamp; only items updated at or after it are returned.
+        - newest_first: walk the dataset newest-first even without since.
+        """
+        items = []
+        async for page_items in self.iter_pages(dataset, stats, since, newest_first):
+            items.extend(page_items)
+        return items
+
+    async def fetch_all(self, datasets=dm.DATASETS, since=None, newest_first=()):
+        """
+        Fetches several datasets concurrently and prints their stats, like
+        data_manager.fetch_all. If one fails the others are cancelled.
+
+        Parameters:
+        - datasets: list of API collection names.
+        - since: optional dict of dataset -> timestamp passed through to fetch_data.
+        - newest_first: datasets walked newest-first even without since.
+        """
+        since = since or {}
+        stats = {dataset: {} for dataset in datasets}
+        tasks = {dataset: asyncio.ensure_future(self.fetch_data(dataset, stats[dataset], since.get(dataset),
+                                                                 dataset in newest_first))
+                 for dataset in datasets}
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        dm.print_fetch_stats(stats)
+        return {dataset: task.result() for dataset, task in tasks.items()}
+
+async def fetch_data_async(dataset, stats=None, since=None, concurrency=dm.PREFETCH_PAGES):
+    # One-off fetch over its own session; see AsyncSellClient.fetch_data
+    async with AsyncSellClient(concurrency) as client:
+        return await client.fetch_data(dataset, stats, since)
+
+async def fetch_all_async(datasets=dm.DATASETS, since=None, concurrency=dm.PREFETCH_PAGES, newest_first=()):
+    # One-off fetch over its own session; see AsyncSellClient.fetch_all
+    async with AsyncSellClient(concurrency) as client:
+        return await client.fetch_all(datasets, since, newest_first)